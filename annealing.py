@@ -0,0 +1,66 @@
+# -----------------------------------------------------------
+# This module represents a simulated annealing solver.
+#
+# A single schedule is improved by moving one lecture at a time:
+# a random lecture violating any constraint gets random feasible
+# room and time slots. Worse moves are accepted with probability
+# exp(delta / temperature), where delta is the change in fulfilled
+# slot constraints, and the temperature cools every generation.
+#
+# Moves are scored incrementally from the schedule's tracked
+# score contributions.
+#
+#
+# (C) 2020 PyShoaib
+# -----------------------------------------------------------
+
+import math
+import random
+
+from fitness import SCORES
+from parameters import Parameters
+from resources import Resources
+from solver import Solver
+
+
+class SimulatedAnnealing(Solver):
+    """
+    Anneals a single schedule, trying `population_size` moves per generation.
+    """
+
+    def __init__(self, resources: Resources, parameters: Parameters):
+        super().__init__(resources, parameters)
+
+        self.temperature = parameters.temperature
+        self._schedule = None
+
+    @property
+    def rates(self):
+        return {'temperature': self.temperature}
+
+    def _initialize(self):
+        self._schedule = self._initial_schedule()
+        self._record(self._schedule)
+
+    def _reproduce(self):
+        schedule = self._schedule
+        constraints_count = len(SCORES) * schedule.layout.size
+
+        for _ in range(self.parameters.population_size):
+            violating = schedule.violating_lectures()
+            if len(violating) == 0 or self.stopped:
+                break
+
+            fitness = schedule.fitness
+            lecture_idxs = [int(random.choice(violating))]
+            old_genes = schedule.reassign(lecture_idxs)
+            schedule.calculate_fitness()
+
+            delta = (schedule.fitness - fitness) * constraints_count
+            if delta < 0 and random.random() >= math.exp(delta / self.temperature):
+                schedule.reassign(lecture_idxs, *old_genes)
+                schedule.calculate_fitness()
+            elif schedule.fitness > self.best_fitness:
+                self._record(schedule)
+
+        self.temperature *= self.parameters.cooling_rate
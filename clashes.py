@@ -1,77 +1,167 @@
-from itertools import combinations
+# -----------------------------------------------------------
+# This module builds the clash graph of lectures.
+#
+# Two lectures clash (are noncurrent) when they share:
+# (1) a teacher,
+# (2) or a section, unless their courses are paired as
+#     electives or one is a prerequisite of the other.
+#
+# Clashes are emitted group by group (lectures of a teacher or
+# a section), and section clashes are filtered against a set of
+# exempt course pairs, so no pair of lectures is checked in Python.
+#
+# The graph is stored as compressed sparse rows over dense
+# lecture indices, with packed bitsets for dense graphs.
+#
+#
+# (C) 2020 PyShoaib
+# -----------------------------------------------------------
+
+from itertools import product
+
+import numpy as np
 
 from resources import Resources
 
+BITSET_DENSITY = 0.02  # fraction of clashing pairs above which bitsets are packed
 
-def set_lectures_noncurrency(resources: Resources):
-    """
-    Add clashing lectures to `noncurrentLectures` set.
-    """
-
-    _set_teachers_noncurrency(resources.teachers, resources.lectures)
 
-    _set_sections_noncurrency(resources.sections, resources.lectures, resources.courses)
+class ClashGraph:
+    """
+    Represents the symmetric clash relation between lectures.
 
+    Neighbours of lecture `idx` are `indices[indptr[idx]:indptr[idx + 1]]`, sorted.
+    """
 
-def _set_teachers_noncurrency(teachers, lectures):
+    def __init__(self, lectures_count: int, sources, targets):
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+
+        # symmetric, without duplicates or self-clashes
+        keys = np.concatenate([
+            sources * lectures_count + targets,
+            targets * lectures_count + sources,
+        ])
+        keys.sort()
+        keys = keys[np.diff(keys, prepend=-1) != 0]
+        rows, columns = keys // lectures_count, keys % lectures_count
+        keys = keys[rows != columns]
+        rows, columns = keys // lectures_count, keys % lectures_count
+
+        self.indptr = np.zeros(lectures_count + 1, dtype=np.int32)
+        np.cumsum(np.bincount(rows, minlength=lectures_count), out=self.indptr[1:])
+        self.indices = columns.astype(np.int32)
+
+        # lecture x packed lectures, for dense graphs only
+        self.bitsets = None
+        if len(keys) > BITSET_DENSITY * lectures_count ** 2:
+            dense = np.zeros((lectures_count, lectures_count), dtype=bool)
+            dense[rows, columns] = True
+            self.bitsets = np.packbits(dense, axis=1)
+
+    @property
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def neighbours(self, idx: int):
+        """
+        Returns indices of lectures clashing with lecture `idx`.
+        """
+        return self.indices[self.indptr[idx]:self.indptr[idx + 1]]
+
+    def __repr__(self):
+        return (
+            f'Lectures: {len(self.indptr) - 1}\n'
+            f'Clashes: {len(self.indices) // 2}\n'
+            f'Bitsets: {self.bitsets is not None}\n'
+        )
+
+
+def build_clash_graph(resources: Resources):
     """
-    Checks if two lectures share a common teacher.
+    Returns the `ClashGraph` of `resources.lectures`.
     """
-    for teacher in teachers.values():
+    lectures, courses = resources.lectures, resources.courses
+    lecture_courses = np.array(
+        [courses[lecture.course_id].index for lecture in lectures.values()], dtype=np.int64
+    )
 
-        # get every combo of two lectures
-        for lecture1_id, lecture2_id in combinations(teacher.lecture_ids, 2):
-            lecture1, lecture2 = lectures[lecture1_id], lectures[lecture2_id]
+    # lectures sharing a teacher always clash
+    teacher_sources, teacher_targets = _group_pairs(
+        _lecture_groups(resources.teachers.values(), lectures)
+    )
 
-            lecture1.noncurrent_lecture_ids.add(lecture2_id)
-            lecture2.noncurrent_lecture_ids.add(lecture1_id)
+    # lectures sharing a section clash, unless their courses are exempt
+    section_sources, section_targets = _group_pairs(
+        _lecture_groups(resources.sections.values(), lectures)
+    )
+    kept = ~np.isin(
+        lecture_courses[section_sources] * len(courses) + lecture_courses[section_targets],
+        _exempt_course_pairs(courses)
+    )
+
+    return ClashGraph(
+        len(lectures),
+        np.concatenate([teacher_sources, section_sources[kept]]),
+        np.concatenate([teacher_targets, section_targets[kept]])
+    )
 
 
-def _set_sections_noncurrency(sections, lectures, courses):
+def _lecture_groups(entities, lectures):
     """
-    Checks if two lectures share a common section.
+    Returns the lecture indices of each entity (teacher or section).
     """
-    for section in sections.values():
-
-        # get every combo of two lectures
-        for lecture1_id, lecture2_id in combinations(section.lecture_ids, 2):
-            lecture1, lecture2 = lectures[lecture1_id], lectures[lecture2_id]
-
-            # check if an elective or prerequisite relation exists
-            if(
-                lecture1_id in lecture2.noncurrent_lecture_ids or
-                _prerequisite_lectures(lecture1, lecture2, courses) or
-                _elective_lectures(lecture1, lecture2, courses)
-            ):
-                continue
-            lecture1.noncurrent_lecture_ids.add(lecture2_id)
-            lecture2.noncurrent_lecture_ids.add(lecture1_id)
+    return [
+        np.array([lectures[lecture_id].index for lecture_id in entity.lecture_ids], dtype=np.int64)
+        for entity in entities
+    ]
 
 
-def _prerequisite_lectures(lecture1, lecture2, courses):
+def _group_pairs(groups):
     """
-    Checks if two lectures share a prerequisite relation
+    Returns every pair of lectures within each group, as two index arrays.
     """
-    course1, course2 = courses[lecture1.course_id], courses[lecture2.course_id]
-
-    # if it's a lab course, get its theory course instead
-    if course1.is_lab_course:
-        course1 = courses[course1.theory_course_id]
-    if course2.is_lab_course:
-        course2 = courses[course2.theory_course_id]
-
-    # check whether one is a prerequisite of the other
-    return(
-        course1.id in course2.prerequisite_ids or
-        course2.id in course1.prerequisite_ids
-    )
+    sources, targets = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for group in groups:
+        firsts, seconds = np.triu_indices(len(group), 1)
+        sources.append(group[firsts])
+        targets.append(group[seconds])
 
+    return np.concatenate(sources), np.concatenate(targets)
 
-def _elective_lectures(lecture1, lecture2, courses):
-    """
-    Checks if two lectures share a common elective pairing
+
+def _exempt_course_pairs(courses):
     """
-    course1, course2 = courses[lecture1.course_id], courses[lecture2.course_id]
+    Returns keys (course1 * courses + course2) of course pairs whose lectures
+    may share a section: one is a prerequisite of the other, or they share
+    an elective pairing.
 
-    # return True if a common pairing exists, False otherwise.
-    return not (course1.elective_pair_ids.isdisjoint(course2.elective_pair_ids))
+    Lab courses follow the prerequisites of their theory course.
+    """
+    # theory course ID -> indices of the course and its labs
+    families = {}
+    for course in courses.values():
+        theory_id = course.theory_course_id if course.is_lab_course else course.id
+        families.setdefault(theory_id, []).append(course.index)
+
+    # elective pairing ID -> indices of paired courses
+    electives = {}
+    for course in courses.values():
+        for pair_id in course.elective_pair_ids:
+            electives.setdefault(pair_id, []).append(course.index)
+
+    pairs = []
+    for course in courses.values():
+        if course.is_lab_course:
+            continue
+        for prerequisite_id in course.prerequisite_ids:
+            pairs.extend(product(families[course.id], families.get(prerequisite_id, ())))
+
+    for course_idxs in electives.values():
+        pairs.extend(product(course_idxs, course_idxs))
+
+    if not pairs:
+        return np.empty(0, dtype=np.int64)
+
+    firsts, seconds = np.array(pairs, dtype=np.int64).T
+    return np.concatenate([firsts * len(courses) + seconds, seconds * len(courses) + firsts])
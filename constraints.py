@@ -0,0 +1,213 @@
+# -----------------------------------------------------------
+# This module provides a dense constraint model of the resources.
+#
+# Constraints are precomputed once as index-based arrays:
+# (1) capacity_rooms    (lecture x room, room's capacity fits lecture)
+# (2) course_slots      (course x day x hour, course availability)
+# (3) course_rooms      (course x room, course availability)
+# (4) teacher_slots     (lecture x day x hour, mean teacher availability)
+# (5) teacher_rooms     (lecture x room, mean teacher availability)
+#
+# Entities are indexed by their dense `index`.
+#
+# `LectureDomains` narrows each lecture to the (day, hour, room)
+# slots satisfying all of its constraints, so that schedules are
+# sampled from feasible slots only.
+#
+#
+# (C) 2020 PyShoaib
+# -----------------------------------------------------------
+
+import numpy as np
+
+from resources import Resources, SlotLayout
+
+
+class ConstraintModel:
+    """
+    Represents the constraints of lectures as lookup tables.
+    """
+
+    def __init__(self, resources: Resources):
+        rooms = list(resources.rooms.values())
+        courses = list(resources.courses.values())
+        lectures = list(resources.lectures.values())
+
+        # course of each lecture
+        self.lecture_courses = np.array(
+            [resources.courses[lecture.course_id].index for lecture in lectures], dtype=np.int32
+        )
+
+        # lecture x room: room's capacity fits lecture's strength
+        capacities = np.array([room.capacity for room in rooms])
+        strengths = np.array([lecture.strength for lecture in lectures])
+        self.capacity_rooms = capacities[np.newaxis, :] >= strengths[:, np.newaxis]
+
+        # course x day x hour, and course x room
+        self.course_slots = np.array(
+            [course.available_slots for course in courses], dtype=np.float64
+        )
+        self.course_rooms = np.array(
+            [[room.id in course.available_room_ids for room in rooms]
+             for course in courses],
+            dtype=bool
+        )
+
+        # lecture x day x hour, and lecture x room, averaged over teachers
+        self.teacher_slots = np.empty((len(lectures),) + self.course_slots.shape[1:])
+        self.teacher_rooms = np.empty((len(lectures), len(rooms)))
+        for idx, lecture in enumerate(lectures):
+            teachers = [resources.teachers[t_id] for t_id in lecture.teacher_ids]
+            if not teachers:
+                self.teacher_slots[idx] = 1.0
+                self.teacher_rooms[idx] = 1.0
+                continue
+            self.teacher_slots[idx] = np.mean(
+                [teacher.available_slots.astype(bool) for teacher in teachers], axis=0
+            )
+            self.teacher_rooms[idx] = np.mean(
+                [[room.id in teacher.available_room_ids for room in rooms]
+                 for teacher in teachers],
+                axis=0
+            )
+
+    def __repr__(self):
+        return (
+            f'Lectures: {len(self.lecture_courses)}\n'
+            f'Courses: {len(self.course_slots)}\n'
+            f'Rooms: {self.capacity_rooms.shape[1]}\n'
+        )
+
+
+class LectureDomains:
+    """
+    Represents the feasible room and time slots of each lecture.
+
+    A slot is feasible when the lecture's room fits its strength, and its
+    course and all its teachers are available at the room, day and hour.
+    Lectures without enough feasible slots fall back to all slots and are
+    reported in `over_constrained`.
+    """
+
+    def __init__(self, resources: Resources, week_days: int, daily_hours: int):
+        constraints: ConstraintModel = resources.constraints
+        layout: SlotLayout = resources.layout
+        lectures_count = len(layout.lecture_ids)
+
+        self.layout = layout
+        self.week_days = week_days
+        self.daily_hours = daily_hours
+
+        # lecture x room
+        courses = constraints.lecture_courses
+        self.rooms = (
+            constraints.capacity_rooms
+            & constraints.course_rooms[courses]
+            & (constraints.teacher_rooms >= 1.0)
+        )
+
+        # lecture x day x hour, the first hour of each slot
+        available = (
+            (constraints.course_slots[courses, :week_days, :daily_hours] > 0)
+            & (constraints.teacher_slots[:, :week_days, :daily_hours] >= 1.0)
+        )
+        self.periods = available.copy()
+        for idx in np.flatnonzero(layout.is_lab):
+            # labs start where all their consecutive hours are available
+            duration = layout.durations[idx]
+            self.periods[idx] = False
+            self.periods[idx, :, :daily_hours - duration + 1] = np.logical_and.reduce(
+                [available[idx, :, hour:daily_hours - duration + 1 + hour] for hour in range(duration)]
+            )
+
+        # fall back to all rooms or all times of lectures without enough of them
+        empty_rooms = ~self.rooms.any(axis=1)
+        self.rooms[empty_rooms] = True
+
+        days = self.periods.any(axis=2).sum(axis=1)
+        empty_periods = np.where(layout.is_lab, days == 0, days < layout.durations)
+        for idx in np.flatnonzero(empty_periods):
+            hours = daily_hours - layout.durations[idx] + 1 if layout.is_lab[idx] else daily_hours
+            self.periods[idx] = False
+            self.periods[idx, :, :hours] = True
+
+        self.over_constrained = [
+            layout.lecture_ids[idx] for idx in np.flatnonzero(empty_rooms | empty_periods)
+        ]
+
+        # compressed rows of feasible rooms, lab starts, and theory hours of each day
+        self.room_indptr, self.room_indices = _compress(self.rooms)
+        self.period_indptr, self.period_indices = _compress(self.periods.reshape(lectures_count, -1))
+        self.hour_indptr, self.hour_indices = _compress(self.periods.reshape(-1, daily_hours))
+        self.days = self.periods.any(axis=2)
+
+    def rooms_of(self, lecture_idx: int):
+        """
+        Returns the feasible rooms of lecture at `lecture_idx`.
+        """
+        return self.room_indices[self.room_indptr[lecture_idx]:self.room_indptr[lecture_idx + 1]]
+
+    def starts_of(self, lecture_idx: int):
+        """
+        Returns the feasible (day * daily_hours + hour) first periods of lecture at `lecture_idx`.
+        """
+        return self.period_indices[self.period_indptr[lecture_idx]:self.period_indptr[lecture_idx + 1]]
+
+    def hours_of(self, lecture_idx: int, day: int):
+        """
+        Returns the feasible hours of lecture at `lecture_idx` on `day`.
+        """
+        cell = lecture_idx * self.week_days + day
+        return self.hour_indices[self.hour_indptr[cell]:self.hour_indptr[cell + 1]]
+
+    def sample_rooms(self, lecture_idxs, draws):
+        """
+        Returns a feasible room of each of `lecture_idxs`, picked by uniform `draws` in [0, 1).
+        """
+        counts = self.room_indptr[lecture_idxs + 1] - self.room_indptr[lecture_idxs]
+        return self.room_indices[self.room_indptr[lecture_idxs] + (draws * counts).astype(np.int32)]
+
+    def sample_starts(self, lecture_idxs, draws):
+        """
+        Returns a feasible (day, hour) of each of `lecture_idxs`, picked by uniform `draws` in [0, 1).
+        """
+        counts = self.period_indptr[lecture_idxs + 1] - self.period_indptr[lecture_idxs]
+        periods = self.period_indices[self.period_indptr[lecture_idxs] + (draws * counts).astype(np.int32)]
+        return periods // self.daily_hours, periods % self.daily_hours
+
+    def sample_hours(self, lecture_idxs, days, draws):
+        """
+        Returns a feasible hour of each of `lecture_idxs` at `days`, picked by uniform `draws` in [0, 1).
+        """
+        cells = lecture_idxs * self.week_days + days
+        counts = self.hour_indptr[cells + 1] - self.hour_indptr[cells]
+        return self.hour_indices[self.hour_indptr[cells] + (draws * counts).astype(np.int32)]
+
+    def __repr__(self):
+        return (
+            f'Lectures: {len(self.rooms)}\n'
+            f'Feasible Slots: {int(self.periods.sum(axis=(1, 2)) @ self.rooms.sum(axis=1))}\n'
+            f'Over-constrained: {self.over_constrained}\n'
+        )
+
+
+def lecture_domains(resources: Resources, week_days: int, daily_hours: int):
+    """
+    Returns the `LectureDomains` of `resources` for a week, built once per week.
+    """
+    domains = resources.domains
+    if domains is None or (domains.week_days, domains.daily_hours) != (week_days, daily_hours):
+        domains = LectureDomains(resources, week_days, daily_hours)
+        resources.domains = domains
+
+    return domains
+
+
+def _compress(mask):
+    """
+    Returns compressed sparse row pointers and column indices of a 2D `mask`.
+    """
+    rows, columns = np.nonzero(mask)
+    indptr = np.zeros(len(mask) + 1, dtype=np.int32)
+    np.cumsum(np.bincount(rows, minlength=len(mask)), out=indptr[1:])
+    return indptr, columns.astype(np.int32)
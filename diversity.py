@@ -0,0 +1,42 @@
+# -----------------------------------------------------------
+# This module measures the diversity of a population.
+#
+# Metrics:
+# (1) unique genomes  (distinct genome digests)
+# (2) gene distance   (mean fraction of slots assigned differently,
+#                      over a sample of schedule pairs)
+#
+#
+# (C) 2020 PyShoaib
+# -----------------------------------------------------------
+
+import numpy as np
+
+DISTANCE_SAMPLE = 32  # schedule pairs compared by `gene_distance`
+
+
+def duplicates(digests):
+    """
+    Returns indices of genomes whose digest occurs earlier in `digests`.
+    """
+    seen = set()
+    idxs = []
+    for idx, digest in enumerate(digests):
+        if digest in seen:
+            idxs.append(idx)
+        seen.add(digest)
+
+    return idxs
+
+
+def gene_distance(genes, sample: int = DISTANCE_SAMPLE, rng=np.random):
+    """
+    Returns the mean fraction of slots assigned a different day, hour or room,
+    between `sample` random pairs of (schedules x 3 x slots) `genes`.
+    """
+    if len(genes) < 2:
+        return 0.0
+
+    firsts = rng.randint(len(genes), size=sample)
+    seconds = (firsts + 1 + rng.randint(len(genes) - 1, size=sample)) % len(genes)
+    return float((genes[firsts] != genes[seconds]).any(axis=1).mean())
@@ -0,0 +1,371 @@
+# -----------------------------------------------------------
+# This module provides a vectorized fitness engine for schedules.
+#
+# All constraints of a schedule are scored at once using
+# array gathers over the lookup tables of a `ConstraintModel`,
+# and bincounts over (day, hour, room) keys.
+#
+# Scores (in order):
+# (1) unique_slots      (no two slots share a day, hour, and room)
+# (2) capacity_rooms    (room's capacity fits lecture's strength)
+# (3) course_slots      (course is available at day and hour)
+# (4) course_rooms      (course is available at room)
+# (5) teacher_slots     (teachers are available at day and hour)
+# (6) teacher_rooms     (teachers are available at room)
+# (7) lecture_slots     (no noncurrent lecture at day and hour)
+#
+# A `FitnessState` keeps per-lecture score contributions and
+# (day, hour, room) occupancy counts of a schedule, so that
+# moving a few lectures only re-scores those lectures and
+# their noncurrent lectures.
+#
+# A `FitnessCache` memoizes scores by genome digest, with
+# least-recently-used eviction.
+#
+#
+# (C) 2020 PyShoaib
+# -----------------------------------------------------------
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from resources import Resources
+
+SCORES = (
+    'unique_slots',
+    'capacity_rooms',
+    'course_slots', 'course_rooms',
+    'teacher_slots', 'teacher_rooms',
+    'lecture_slots',
+)
+
+BATCH_SIZE = 1 << 22  # array elements scored at once by `evaluate_population`
+
+
+class FitnessState:
+    """
+    Holds the score contributions of a single schedule.
+    """
+
+    def __init__(self, lectures, cells, unique, clashes):
+        self.lectures = lectures  # lecture x scores 2. - 7.
+        self.cells = cells  # slots in each (day, hour, room) cell
+        self.unique = unique  # cells holding exactly one slot
+        self.clashes = clashes  # noncurrent slots at the day and hour of each slot
+
+    def copy(self):
+        return FitnessState(
+            self.lectures.copy(), self.cells.copy(), self.unique, self.clashes.copy()
+        )
+
+
+class FitnessCache:
+    """
+    Maps genome digests to scores, evicting the least recently used.
+
+    A `size` of 0 disables caching.
+    """
+
+    def __init__(self, size: int = 0):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+        self._scores = OrderedDict()
+
+    def get(self, digest: bytes):
+        """
+        Returns a copy of the scores cached for `digest`, or None.
+        """
+        scores = self._scores.get(digest)
+        if scores is None:
+            self.misses += 1
+            return None
+
+        self._scores.move_to_end(digest)
+        self.hits += 1
+        return scores.copy()
+
+    def put(self, digest: bytes, scores):
+        if self.size <= 0:
+            return
+
+        self._scores[digest] = scores.copy()
+        self._scores.move_to_end(digest)
+        if len(self._scores) > self.size:
+            self._scores.popitem(last=False)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __repr__(self):
+        return (
+            f'Size: {len(self._scores)}/{self.size}\n'
+            f'Hits: {self.hits}\n'
+            f'Misses: {self.misses}\n'
+        )
+
+
+class FitnessEngine:
+    """
+    Scores schedules' gene arrays against all constraints.
+
+    Requires `Resources` with a layout and a constraint model.
+    """
+
+    def __init__(self, resources: Resources):
+        layout = resources.layout
+
+        self.constraints = resources.constraints
+        self.slot_lectures = layout.slot_lectures
+        self.offsets = layout.offsets
+        self.durations = layout.durations
+
+        # (slot, noncurrent lecture) pairs, one per clash of the slot's lecture
+        graph = resources.clashes
+        self.clash_graph = graph
+        self.clash_slots = np.repeat(
+            np.arange(layout.size, dtype=np.int32), graph.degrees[self.slot_lectures]
+        )
+        self.clash_lectures = graph.indices[_ranges(
+            graph.indptr[self.slot_lectures], graph.indptr[self.slot_lectures + 1]
+        )]
+        self.clash_starts = np.flatnonzero(np.diff(self.clash_slots, prepend=-1))
+
+        # packed noncurrent lectures of each slot, for dense clash graphs
+        self.slot_bitsets = None
+        if graph.bitsets is not None:
+            self.slot_bitsets = graph.bitsets[self.slot_lectures]
+
+        self.rooms_count = len(layout.room_ids)
+        self.lectures_count = len(resources.lectures)
+
+    def evaluate(self, days, hours, rooms, week_days, daily_hours):
+        """
+        Returns the scores of a schedule's gene arrays, each scaled between 0 and 1.
+        """
+        return self.scores(self.build_state(days, hours, rooms, week_days, daily_hours))
+
+    def evaluate_population(self, days, hours, rooms, week_days, daily_hours):
+        """
+        Returns the scores of a population's (schedules x slots) gene matrices.
+
+        Schedules are scored in chunks bounded by `BATCH_SIZE` array elements.
+        """
+        population_size, slots_count = days.shape
+        periods_count = week_days * daily_hours
+        clash_keys = self.clash_lectures * periods_count
+        cells_count = periods_count * self.rooms_count
+        scores = np.empty((population_size, len(SCORES)))
+
+        chunk = max(1, BATCH_SIZE // max(
+            slots_count, len(self.clash_slots), cells_count, self.lectures_count * periods_count,
+            self.slot_bitsets.size if self.slot_bitsets is not None else 0
+        ))
+        for start in range(0, population_size, chunk):
+            end = min(start + chunk, population_size)
+            d, h, r = days[start:end], hours[start:end], rooms[start:end]
+            rows = np.arange(end - start)[:, np.newaxis]
+            periods = d * daily_hours + h
+
+            # 1. Pauli Exclusion [no two slots have the same day, hour, and room]
+            cells = np.bincount(
+                (rows * cells_count + periods * self.rooms_count + r).ravel(),
+                minlength=(end - start) * cells_count
+            ).reshape(end - start, cells_count)
+            scores[start:end, 0] = np.count_nonzero(cells == 1, axis=1)
+
+            # 2. - 6. constraints local to each slot
+            constraints = self.constraints
+            lectures = self.slot_lectures
+            courses = constraints.lecture_courses[lectures]
+            scores[start:end, 1] = np.count_nonzero(constraints.capacity_rooms[lectures, r], axis=1)
+            scores[start:end, 2] = constraints.course_slots[courses, d, h].sum(axis=1)
+            scores[start:end, 3] = np.count_nonzero(constraints.course_rooms[courses, r], axis=1)
+            scores[start:end, 4] = constraints.teacher_slots[lectures, d, h].sum(axis=1)
+            scores[start:end, 5] = constraints.teacher_rooms[lectures, r].sum(axis=1)
+
+            # 7. No noncurrent lecture at this day and hour
+            scores[start:end, 6] = slots_count
+            if self.slot_bitsets is not None:
+                present = np.zeros((end - start, periods_count, self.lectures_count), dtype=bool)
+                present[rows, periods, lectures] = True
+                present = np.packbits(present, axis=2)
+                scores[start:end, 6] -= np.count_nonzero(
+                    (self.slot_bitsets & present[rows, periods]).any(axis=2), axis=1
+                )
+            elif len(self.clash_slots):
+                keys_count = self.lectures_count * periods_count
+                occupied = np.zeros((end - start) * keys_count, dtype=bool)
+                occupied[(rows * keys_count + lectures * periods_count + periods).ravel()] = True
+                clashes = occupied.take((
+                    rows * keys_count + clash_keys + periods[:, self.clash_slots]
+                ).ravel()).reshape(end - start, -1)
+                scores[start:end, 6] -= np.count_nonzero(
+                    np.logical_or.reduceat(clashes, self.clash_starts, axis=1), axis=1
+                )
+
+        return scores / slots_count
+
+    def build_state(self, days, hours, rooms, week_days, daily_hours):
+        """
+        Scores a schedule's gene arrays into a `FitnessState`.
+        """
+        lectures = self.slot_lectures
+        periods = days * daily_hours + hours
+
+        # 1. Pauli Exclusion [no two slots have the same day, hour, and room]
+        cells = np.bincount(
+            periods * self.rooms_count + rooms,
+            minlength=week_days * daily_hours * self.rooms_count
+        ).astype(np.int32)
+
+        # 2. - 6. constraints local to each slot
+        slot_values = np.empty((len(lectures), len(SCORES) - 1))
+        slot_values[:, :5] = self._slot_values(days, hours, rooms, lectures)
+
+        # 7. No noncurrent lecture at this day and hour
+        periods_count = week_days * daily_hours
+        occupied = np.bincount(
+            lectures * periods_count + periods, minlength=self.lectures_count * periods_count
+        )
+        clashes = np.bincount(
+            self.clash_slots,
+            weights=occupied[self.clash_lectures * periods_count + periods[self.clash_slots]],
+            minlength=len(lectures)
+        ).astype(np.int32)
+        slot_values[:, 5] = clashes == 0
+
+        lecture_values = np.empty((self.lectures_count, len(SCORES) - 1))
+        for idx, column in enumerate(slot_values.T):
+            lecture_values[:, idx] = np.bincount(
+                lectures, weights=column, minlength=self.lectures_count
+            )
+
+        return FitnessState(lecture_values, cells, np.count_nonzero(cells == 1), clashes)
+
+    def update_state(self, state, lecture_idxs, old_days, old_hours, old_rooms,
+                     days, hours, rooms, week_days, daily_hours):
+        """
+        Re-scores `state` after lectures at `lecture_idxs` were moved.
+
+        `old_days`, `old_hours` and `old_rooms` hold the previous genes of
+        the moved lectures' slots, in the order of `lecture_idxs`.
+        Only the moved lectures and their noncurrent lectures are re-scored.
+        """
+        lecture_idxs = np.asarray(lecture_idxs, dtype=np.int32)
+        rows = self.slots_of(lecture_idxs)
+
+        # 1. move the slots between (day, hour, room) cells
+        old_cells = (old_days * daily_hours + old_hours) * self.rooms_count + old_rooms
+        new_cells = (days[rows] * daily_hours + hours[rows]) * self.rooms_count + rooms[rows]
+        touched = np.unique(np.concatenate([old_cells, new_cells]))
+        state.unique -= np.count_nonzero(state.cells[touched] == 1)
+        np.subtract.at(state.cells, old_cells, 1)
+        np.add.at(state.cells, new_cells, 1)
+        state.unique += np.count_nonzero(state.cells[touched] == 1)
+
+        # 2. - 6. constraints local to the moved slots
+        slot_values = self._slot_values(days[rows], hours[rows], rooms[rows], self.slot_lectures[rows])
+        state.lectures[lecture_idxs, :5] = 0.0
+        for idx, column in enumerate(slot_values.T):
+            np.add.at(state.lectures[:, idx], self.slot_lectures[rows], column)
+
+        # 7. noncurrent slots sharing the old or new day and hour of the moved slots
+        starts = self.clash_graph.indptr[self.slot_lectures[rows]]
+        ends = self.clash_graph.indptr[self.slot_lectures[rows] + 1]
+        others = self.clash_graph.indices[_ranges(starts, ends)]
+        positions = np.repeat(np.arange(len(rows)), ends - starts)
+        positions = np.repeat(positions, self.durations[others])
+        others = self.slots_of(others)
+
+        other_days, other_hours = days[others], hours[others]
+        old_hits = (old_days[positions] == other_days) & (old_hours[positions] == other_hours)
+        new_hits = (days[rows][positions] == other_days) & (hours[rows][positions] == other_hours)
+
+        moved = np.zeros(self.lectures_count, dtype=bool)
+        moved[lecture_idxs] = True
+        kept = ~moved[self.slot_lectures[others]] & (old_hits != new_hits)
+
+        touched = np.union1d(rows, others[kept])
+        was_clashing = state.clashes[touched] > 0
+
+        np.add.at(state.clashes, others[kept], new_hits[kept].astype(np.int32) - old_hits[kept])
+        state.clashes[rows] = np.bincount(positions[new_hits], minlength=len(rows))
+
+        np.add.at(
+            state.lectures[:, 5], self.slot_lectures[touched],
+            was_clashing.astype(np.float64) - (state.clashes[touched] > 0)
+        )
+
+    def scores(self, state: FitnessState):
+        """
+        Returns the scores held in `state`, each scaled between 0 and 1.
+        """
+        scores = np.empty(len(SCORES))
+        scores[0] = state.unique
+        scores[1:] = state.lectures.sum(axis=0)
+
+        return scores / len(self.slot_lectures)
+
+    def violations(self, state: FitnessState, days, hours, rooms, daily_hours):
+        """
+        Returns whether each lecture violates any constraint in `state`.
+        """
+        cells = ((days * daily_hours + hours) * self.rooms_count + rooms)
+        slots = (state.cells[cells] > 1) | (state.clashes > 0)
+
+        violating = np.zeros(self.lectures_count, dtype=bool)
+        violating[self.slot_lectures[slots]] = True
+        violating |= state.lectures.sum(axis=1) < (len(SCORES) - 1) * self.durations - 1e-9
+        return violating
+
+    def slots_of(self, lecture_idxs):
+        """
+        Returns the slots (gene rows) of lectures at `lecture_idxs`.
+        """
+        return _ranges(self.offsets[lecture_idxs], self.offsets[lecture_idxs + 1])
+
+    # ----------------------------------------
+    # PRIVATE METHODS
+    # ----------------------------------------
+
+    def _slot_values(self, days, hours, rooms, lectures):
+        """
+        Returns scores 2. - 6. of each slot.
+        """
+        constraints = self.constraints
+        courses = constraints.lecture_courses[lectures]
+        return np.stack([
+            constraints.capacity_rooms[lectures, rooms],
+            constraints.course_slots[courses, days, hours],
+            constraints.course_rooms[courses, rooms],
+            constraints.teacher_slots[lectures, days, hours],
+            constraints.teacher_rooms[lectures, rooms],
+        ], axis=1)
+
+
+def genome_digest(genes):
+    """
+    Returns a digest of a schedule's (3 x slots) days, hours and rooms.
+    """
+    return hashlib.blake2b(np.ascontiguousarray(genes).tobytes(), digest_size=16).digest()
+
+
+def _ranges(starts, ends):
+    """
+    Returns the concatenation of `range(start, end)` for each pair.
+    """
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int32)
+    shifts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return (np.arange(total) + shifts).astype(np.int32)
@@ -0,0 +1,173 @@
+# -----------------------------------------------------------
+# This module runs a schedule search in a child process.
+#
+# The CPU-bound search runs outside the web worker, so the
+# websocket loop stays responsive during long runs.
+#
+# Progress channel:
+# (1) shared memory  (generation, best fitness, and scores,
+#                     always the latest values)
+# (2) pipe           (rates and changed lecture assignments once the
+#                     best schedule improves, at most every
+#                     `PROGRESS_INTERVAL` seconds, the final result)
+#
+# The web worker polls both without blocking, and applies the
+# changed assignments to its own copy of the resources.
+#
+#
+# (C) 2020 PyShoaib
+# -----------------------------------------------------------
+
+import time
+from multiprocessing import Array, Event, Pipe, Process
+
+import numpy as np
+
+from annealing import SimulatedAnnealing
+from fitness import SCORES
+from genetic_algorithm import GeneticAlgorithm
+from islands import IslandModel
+from parameters import Parameters
+from resources import Resources
+from tabu_search import TabuSearch
+
+# Solvers selectable by the 'engine' field of a generation request
+ENGINES = {
+    'genetic': GeneticAlgorithm,
+    'islands': IslandModel,
+    'annealing': SimulatedAnnealing,
+    'tabu': TabuSearch,
+}
+
+PROGRESS_INTERVAL = 1.0  # minimum seconds between progress messages
+
+
+class Generation:
+    """
+    Runs the solver of `engine` on `resources` in a child process.
+
+    Call `poll` to update the progress attributes from the child,
+    and the assigned slots of `resources.lectures` to the best schedule.
+    """
+
+    def __init__(self, resources: Resources, engine: str, parameters: Parameters):
+        if engine not in ENGINES:
+            raise ValueError(f'Unknown engine: {engine}')
+
+        self.generation = 0
+        self.best_fitness = 0.0
+        self.scores = [0.0] * len(SCORES)  # ordered as `fitness.SCORES`
+        self.rates = {}
+        self.resources = resources
+        self.optimum_reached = False
+        self.timed_out = False
+        self.finished = False
+        self.error = None
+
+        self._progress = Array('d', 2 + len(SCORES))
+        self._cancel = Event()
+        self._connection, connection = Pipe(duplex=False)
+
+        # not a daemon, so that the solver can start its own processes
+        self._process = Process(
+            target=_generate,
+            args=(connection, self._progress, self._cancel, resources, engine, parameters)
+        )
+        self._process.start()
+        connection.close()
+
+    def poll(self):
+        """
+        Read the progress published by the child, without blocking.
+
+        Returns the assigned slots of lectures changed since the last poll by lecture ID,
+        or None if the child sent no progress.
+        """
+        with self._progress.get_lock():
+            progress = self._progress[:]
+        self.generation = int(progress[0])
+        self.best_fitness = progress[1]
+        self.scores = progress[2:]
+
+        changes = None
+        while not self.finished and self._connection.poll():
+            try:
+                message = self._connection.recv()
+            except EOFError:
+                self.error = self.error or 'generation process exited'
+                self.finished = True
+                break
+
+            if message[0] == 'progress':
+                _, self.rates, lecture_changes = message
+            elif message[0] == 'done':
+                _, self.optimum_reached, self.timed_out, lecture_changes = message
+                self.finished = True
+            else:
+                self.error = message[1]
+                self.finished = True
+                break
+
+            for lecture_id, slots in lecture_changes.items():
+                self.resources.lectures[lecture_id].assigned_slots = slots
+            changes = changes or {}
+            changes.update(lecture_changes)
+
+        return changes
+
+    def cancel(self):
+        """
+        Ask the child to stop, within one generation.
+        """
+        self._cancel.set()
+
+    def close(self):
+        """
+        Wait for the child to exit.
+        """
+        self._connection.close()
+        self._process.join()
+
+
+# ----------------------------------------
+# CHILD PROCESS
+# ----------------------------------------
+
+def _generate(connection, progress, cancel, resources, engine, parameters):
+    try:
+        solver = ENGINES[engine](resources, parameters)
+        solver.stop_event = cancel
+        sent_genes, sent_fitness, sent_time = None, None, 0.0
+        try:
+            solver.initialize()
+            while not solver.done:
+                solver.step()
+
+                with progress.get_lock():
+                    progress[0] = solver.generation
+                    progress[1] = solver.best_fitness
+                    progress[2:] = solver.best_schedule.scores.tolist()
+
+                if solver.best_fitness != sent_fitness and time.monotonic() - sent_time >= PROGRESS_INTERVAL:
+                    changes, sent_genes = _changes(solver.best_schedule, sent_genes)
+                    connection.send(('progress', solver.rates, changes))
+                    sent_fitness, sent_time = solver.best_fitness, time.monotonic()
+        finally:
+            solver.close()
+
+        changes, _ = _changes(solver.best_schedule, sent_genes)
+        connection.send(('done', solver.optimum_reached, solver.timed_out, changes))
+    except Exception as error:
+        connection.send(('failed', repr(error)))
+    finally:
+        connection.close()
+
+
+def _changes(schedule, sent_genes):
+    """
+    Returns the assigned slots of lectures changed since `sent_genes` by lecture ID,
+    with the genes of `schedule`. All lectures changed if `sent_genes` is None.
+    """
+    genes = np.stack([schedule.days, schedule.hours, schedule.rooms])
+    lecture_idxs = None if sent_genes is None else schedule.changed_lectures(sent_genes)
+    return schedule.assigned_slots(lecture_idxs), genes
@@ -9,95 +9,497 @@
 # After initialization, a single method 'run' will
 # operate to generate new generations until a solution is found.
 #
+# The population is a single gene matrix, bred and scored by
+# batched operators. Offspring are bred in fixed-size chunks,
+# each with its own random seed, either in-process or across
+# a pool of worker processes (`Parameters.workers`). Results
+# are reproducible for a given `Parameters.seed`.
+#
+# Offspring are scored from scratch in a single batch, which is
+# cheaper than the incremental updates of a `FitnessState`: the
+# population keeps no per-schedule state to update, and building
+# one costs a full evaluation. Incremental scoring is used where
+# a single schedule is moved repeatedly, by local search repair.
+#
+# Replacements:
+# (1) generational  (offspring replace all but the best schedule)
+# (2) steady_state  (a few offspring replace the worst schedules
+#                    in place, duplicates of members are rejected,
+#                    so a generation evaluates `offspring_size`
+#                    schedules instead of `population_size`)
+#
+# Generational offspring repeating a genome are culled, and
+# after `stagnation_limit` generations without improvement the
+# worst schedules are restarted at random or hypermutated.
+#
+# In adaptive mode, the mutation size follows the 1/5th success
+# rule, crossover and mutation rates share credit by the success
+# of the offspring each produced, and the mutation rate rises
+# while diversity is low.
+#
+# A stopped run abandons the generation it is breeding,
+# leaving the population as it was.
+#
 #
 # (C) 2020 PyShoaib
 # -----------------------------------------------------------
 
+from multiprocessing import Pool
+
+from constraints import lecture_domains
+from diversity import duplicates, gene_distance
+from fitness import SCORES, FitnessCache, genome_digest
+from local_search import repair
+from operators import crossover, mutate, random_genes
 from schedule import Schedule
+from seeding import greedy_genes
+from selection import select_parents
+from solver import Solver
 from parameters import Parameters
 from resources import Resources
 import numpy as np
 
+# Offspring bred by a single task. Chunks do not depend on `workers`, so that
+# results are reproducible; small chunks let a population of 100 spread over
+# a dozen workers, at the cost of a few milliseconds per chunk in-process.
+CHUNK_SIZE = 8
+
+REPLACEMENTS = ('generational', 'steady_state')
+RESTART_MODES = ('restart', 'hypermutation')
+HYPERMUTATION_SIZE = 0.5  # lectures reassigned by a hypermutation
+
+# adaptive rates
+ADAPTATION = 1.2  # factor by which the mutation size grows or shrinks per generation
+SUCCESS_TARGET = 0.2  # fraction of improving mutants, the 1/5th success rule
+CREDIT_DECAY = 0.3  # weight of the latest generation in an operator's running success
+CREDIT_FLOOR = 0.05  # running success credited to either operator, to keep both in use
+DIVERSITY_TARGET = 0.1  # gene distance below which the mutation size grows
+CROSSOVER_RATES = (0.1, 1.0)
+MUTATION_RATES = (0.01, 1.0)
+MAXIMUM_MUTATION_SIZE = 0.5
 
-class GeneticAlgorithm:
+
+class GeneticAlgorithm(Solver):
+    """
+    Evolves a population stored as a (population x 3 x slots) gene matrix
+    of days, hours and rooms, with a row of scores for each schedule.
+    """
 
     def __init__(self, resources: Resources, parameters: Parameters):
-        self.resources = resources
-        self.parameters = parameters
+        if parameters.replacement not in REPLACEMENTS:
+            raise ValueError(f'Unknown replacement: {parameters.replacement}')
+        if parameters.restart_mode not in RESTART_MODES:
+            raise ValueError(f'Unknown restart mode: {parameters.restart_mode}')
 
-        self.generation = 0
-        self.optimum_reached = False
-        self.best_fitness = 0.0
-        self.best_schedule = None
+        super().__init__(resources, parameters)
 
-        self._population = np.empty(
-            shape=parameters.population_size,
-            dtype=Schedule
-        )
+        shape = (parameters.population_size, 3, resources.layout.size)
+        self._genes = np.zeros(shape, dtype=np.int32)
+        self._scores = np.zeros((parameters.population_size, len(SCORES)))
+        self._fitness = np.zeros(parameters.population_size)
+        self._digests = [None] * parameters.population_size
+        self._pool = None
+
+        # scores of recently seen genomes, across generations
+        self.cache = FitnessCache(parameters.cache_size)
+
+        # effective rates, adjusted during the run in adaptive mode
+        self.mutation_rate = parameters.mutation_rate
+        self.mutation_size = parameters.mutation_size
+        self.crossover_rate = parameters.crossover_rate
+        self._credits = {'crossover': 0.0, 'mutation': 0.0}  # running success of each operator
+
+        # diversity of the population, and generations since the best improved
+        self.unique_genomes = 0
+        self.gene_distance = 0.0
+        self.stagnant_generations = 0
+        self._diversity_random = np.random.RandomState(parameters.seed)
+
+    @property
+    def rates(self):
+        """
+        Returns the effective rates of the current generation, for progress messages.
+        """
+        return {
+            'mutationRate': self.mutation_rate,
+            'mutationSize': self.mutation_size,
+            'crossoverRate': self.crossover_rate,
+        }
+
+    def close(self):
+        """
+        Stop the worker processes, if any.
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def migrants(self, size: int):
+        """
+        Returns the genes and scores of the best `size` schedules.
+        """
+        idxs = np.argsort(self._fitness)[::-1][:size]
+        return self._genes[idxs], self._scores[idxs]
+
+    def accept_migrants(self, genes, scores):
+        """
+        Replace the worst schedules with migrants' `genes` and `scores`.
+
+        At most `population_size - 1` of the best migrants are accepted,
+        so the best schedule is never replaced.
+        """
+        best = np.argsort(scores.mean(axis=1))[::-1][:self.parameters.population_size - 1]
+        genes, scores = genes[best], scores[best]
 
-    def run(self):
-        self._initialize()
-        while (not self.optimum_reached) and (self.generation < self.parameters.maximum_generations):
-            self._reproduce()
-            self.generation += 1
-            print(f'Gen: {self.generation}  Best: {self.best_fitness}')
+        worst = np.argsort(self._fitness)[:len(genes)]
+        self._genes[worst] = genes
+        self._scores[worst] = scores
+        for idx, schedule_genes in zip(worst, genes):
+            self._digests[idx] = genome_digest(schedule_genes)
 
-        return self.optimum_reached
+        self._fitness = self._scores.mean(axis=1)
+        self._track_best()
 
     def _initialize(self):
         """
         Initialize the population of schedules.
         """
-        for idx in range(self.parameters.population_size):
-            self._population[idx] = Schedule(self.resources, self.parameters)
-            self._population[idx].initialize()
-            self._population[idx].calculate_fitness()
+        if self.parameters.workers > 1 and self._pool is None:
+            self._pool = Pool(
+                processes=self.parameters.workers,
+                initializer=_init_worker,
+                initargs=(self.resources, self.parameters)
+            )
+
+        domains = self._domains()
+        if domains.over_constrained:
+            print(f'Over-constrained lectures: {domains.over_constrained}')
 
+        # part of the population is built greedily, the rest stays random for diversity
+        greedy = int(self.parameters.greedy_fraction * self.parameters.population_size)
+        self._genes = np.concatenate([
+            greedy_genes(domains, self.resources.clashes, greedy),
+            random_genes(domains, self.parameters.population_size - greedy),
+        ])
+        self._scores = _evaluate_genes(self.resources, self.parameters, self._genes, self.cache)
+        self._fitness = self._scores.mean(axis=1)
+        self._digests = [genome_digest(schedule_genes) for schedule_genes in self._genes]
         self._track_best()
+        self._measure_diversity()
 
     def _reproduce(self):
-        population = np.empty_like(self._population)
+        best_fitness = self.best_fitness
+
+        # a generation abandoned by a stop leaves the population as it was
+        if self.parameters.replacement == 'steady_state':
+            if not self._replace_worst():
+                return False
+        else:
+            if not self._replace_generation():
+                return False
+            if self.parameters.cull_duplicates:
+                self._cull_duplicates()
+
+        self._repair()
+        self._track_best()
 
-        for idx in range(self.parameters.population_size - 1):
+        # restart part of the population once the best stops improving
+        self.stagnant_generations = 0 if self.best_fitness > best_fitness else self.stagnant_generations + 1
+        if 0 < self.parameters.stagnation_limit <= self.stagnant_generations and not self.stopped:
+            self._restart()
+            self.stagnant_generations = 0
+
+        self._measure_diversity()
+
+    def _cull_duplicates(self):
+        """
+        Replace repeated genomes with random schedules.
+        """
+        idxs = duplicates(self._digests)
+        if idxs:
+            self._renew(idxs, random_genes(self._domains(), len(idxs)))
 
-            # crossover
-            parent1, parent2 = self._tournament_selection(), self._tournament_selection()
+    def _restart(self):
+        """
+        Replace or hypermutate the worst `restart_fraction` of the population, keeping the best.
+        """
+        count = min(
+            int(self.parameters.restart_fraction * self.parameters.population_size),
+            self.parameters.population_size - 1
+        )
+        idxs = np.argsort(self._fitness)[:count]
 
-            while parent1 is parent2:
-                parent2 = self._tournament_selection()
+        if self.parameters.restart_mode == 'hypermutation':
+            genes = mutate(self._genes[idxs], self._domains(), HYPERMUTATION_SIZE)
+        else:
+            genes = random_genes(self._domains(), count)
+        self._renew(idxs, genes)
 
-            child = Schedule(self.resources, self.parameters)
+    def _renew(self, idxs, genes):
+        """
+        Replace schedules at `idxs` with `genes`.
+        """
+        self._genes[idxs] = genes
+        self._scores[idxs] = _evaluate_genes(self.resources, self.parameters, genes, self.cache)
+        self._fitness[idxs] = self._scores[idxs].mean(axis=1)
+        for idx, schedule_genes in zip(idxs, genes):
+            self._digests[idx] = genome_digest(schedule_genes)
 
-            if np.random.binomial(1, p=self.parameters.crossover_rate):
-                child.crossover(parent1, parent2)
-            else:
-                child.copy(np.random.choice([parent1, parent2]))
+    def _measure_diversity(self):
+        self.unique_genomes = len(set(self._digests))
+        self.gene_distance = gene_distance(self._genes, rng=self._diversity_random)
 
-            # mutation
-            if np.random.binomial(1, self.parameters.mutation_rate):
-                child.mutate()
+    def _domains(self):
+        return lecture_domains(self.resources, self.parameters.week_days, self.parameters.daily_hours)
 
-            child.calculate_fitness()
+    def _replace_generation(self):
+        """
+        Replace the whole population with offspring, except the best schedule.
 
-            population[idx] = child
+        Returns False if the run is stopped while breeding them.
+        """
+        offspring = self._offspring(self.parameters.population_size - 1)
+        if offspring is None:
+            return False
+        genes, scores = offspring
 
         # preserve the best
-        child = Schedule(self.resources, self.parameters)
-        if self.best_schedule is not None:
-            child.copy(self.best_schedule)
+        best = np.argmax(self._fitness)
+        self._genes = np.concatenate([genes, self._genes[best][np.newaxis]])
+        self._scores = np.concatenate([scores, self._scores[best][np.newaxis]])
+        self._fitness = self._scores.mean(axis=1)
+        self._digests = [genome_digest(schedule_genes) for schedule_genes in self._genes]
+        return True
+
+    def _replace_worst(self):
+        """
+        Replace the worst schedules in place with `offspring_size` offspring,
+        rejecting offspring already in the population.
+
+        Returns False if the run is stopped while breeding them.
+        """
+        offspring = self._offspring(self.parameters.offspring_size)
+        if offspring is None:
+            return False
+        genes, scores = offspring
+
+        present = set(self._digests)
+        worst = iter(np.argsort(self._fitness)[:self.parameters.population_size - 1])
+        for child_genes, child_scores in zip(genes, scores):
+            digest = genome_digest(child_genes)
+            if digest in present:
+                continue
+            idx = next(worst, None)
+            if idx is None:
+                break
+            present.add(digest)
+
+            self._genes[idx] = child_genes
+            self._scores[idx] = child_scores
+            self._fitness[idx] = child_scores.mean()
+            self._digests[idx] = digest
+        return True
+
+    def _offspring(self, size: int):
+        """
+        Returns the (size x 3 x slots) genes and (size x scores) scores of `size` evaluated offspring,
+        or None if the run is stopped while breeding them.
+        """
+        genes = np.empty((size,) + self._genes.shape[1:], dtype=self._genes.dtype)
+        scores = np.empty((size, self._scores.shape[1]))
+
+        parents = select_parents(
+            self._fitness, size, self.parameters.selection, self.parameters.selection_pressure
+        )
+
+        crossovers = np.random.binomial(1, self.crossover_rate, size=size).astype(bool)
+        mutations = np.random.binomial(1, self.mutation_rate, size=size).astype(bool)
+
+        # copy either parent when no crossover occurs
+        parents[~crossovers, 0] = parents[~crossovers, np.random.randint(2, size=size)[~crossovers]]
+
+        # children that are plain copies need no breeding
+        copies = np.flatnonzero(~crossovers & ~mutations)
+        genes[copies] = self._genes[parents[copies, 0]]
+        scores[copies] = self._scores[parents[copies, 0]]
+
+        # crossover and mutation, chunk by chunk
+        bred = np.flatnonzero(crossovers | mutations)
+        chunks = [bred[start:start + CHUNK_SIZE] for start in range(0, len(bred), CHUNK_SIZE)]
+        seeds = np.random.randint(np.iinfo(np.int32).max, size=len(chunks))
+        tasks = [
+            (seed, self._genes[parents[chunk, 0]], self._genes[parents[chunk, 1]],
+             crossovers[chunk], mutations[chunk], self.mutation_size)
+            for chunk, seed in zip(chunks, seeds)
+        ]
+
+        if self._pool is None:
+            for chunk, task in zip(chunks, tasks):
+                if self.stopped:
+                    return None
+                genes[chunk] = _breed(self.resources, self.parameters, *task)
+            # mutants too are batch scored, see the module comment
+            scores[bred] = _evaluate_genes(self.resources, self.parameters, genes[bred], self.cache)
         else:
-            child.initialize()
-        population[-1] = child
+            for chunk, (chunk_genes, chunk_scores, hits, misses) in zip(
+                    chunks, self._pool.imap(_breed_task, tasks)):
+                if self.stopped:
+                    return None
+                genes[chunk], scores[chunk] = chunk_genes, chunk_scores
+                self.cache.hits += hits
+                self.cache.misses += misses
+                for child_genes, child_scores in zip(chunk_genes, chunk_scores):
+                    self.cache.put(genome_digest(child_genes), child_scores)
 
-        self._population = population
-        self._track_best()
+        if self.parameters.adaptive:
+            parent_fitness = np.where(
+                crossovers, self._fitness[parents].max(axis=1), self._fitness[parents[:, 0]]
+            )
+            self._adapt(scores.mean(axis=1) > parent_fitness, crossovers, mutations)
+
+        return genes, scores
+
+    def _adapt(self, improved, crossovers, mutations):
+        """
+        Adjust the effective rates from the offspring that `improved` on their parents.
+
+        The mutation size follows the 1/5th success rule. Crossover and mutation
+        rates share credit in proportion to their running success, and the
+        mutation rate is raised while the population lacks diversity.
+        """
+        for operator, produced in (('crossover', crossovers), ('mutation', mutations)):
+            if produced.any():
+                self._credits[operator] += CREDIT_DECAY * (improved[produced].mean() - self._credits[operator])
+
+        mutated = mutations & ~crossovers
+        if mutated.any():
+            factor = ADAPTATION if improved[mutated].mean() > SUCCESS_TARGET else 1 / ADAPTATION
+            self.mutation_size = float(np.clip(
+                self.mutation_size * factor, 1 / len(self.resources.lecture_ids), MAXIMUM_MUTATION_SIZE
+            ))
+
+        share = (self._credits['crossover'] + CREDIT_FLOOR) / (sum(self._credits.values()) + 2 * CREDIT_FLOOR)
+        self.crossover_rate = float(np.clip(share, *CROSSOVER_RATES))
+        self.mutation_rate = float(np.clip(1 - share, *MUTATION_RATES))
+
+        if self.gene_distance < DIVERSITY_TARGET:
+            self.mutation_rate = float(np.clip(self.mutation_rate * ADAPTATION, *MUTATION_RATES))
+
+    def _repair(self):
+        """
+        Improve the best schedules of the generation by local search.
+        """
+        if self.parameters.repair_steps <= 0:
+            return
+
+        count = max(1, int(self.parameters.repair_fraction * self.parameters.population_size))
+        for idx in np.argsort(self._fitness)[::-1][:count]:
+            if self.stopped:
+                break
+            schedule = _schedule(self.resources, self.parameters, self._genes[idx], self._scores[idx])
+            repair(schedule, self.parameters.repair_steps)
 
-    def _tournament_selection(self):
-        pressure = self.parameters.selection_pressure
-        return np.amax(np.random.choice(self._population, size=pressure))
+            self._genes[idx] = schedule.days, schedule.hours, schedule.rooms
+            self._scores[idx] = schedule.scores
+            self._fitness[idx] = schedule.fitness
+            self._digests[idx] = genome_digest(self._genes[idx])
 
     def _track_best(self):
-        self.best_schedule = np.amax(self._population)
-        self.best_fitness = self.best_schedule.fitness
+        best = np.argmax(self._fitness)
+        if self._fitness[best] > self.best_fitness or self.best_schedule is None:
+            self.best_schedule = _schedule(
+                self.resources, self.parameters, self._genes[best], self._scores[best]
+            )
+        self.best_fitness = self._fitness[best]
 
         self.optimum_reached = self.best_fitness == 1.0
+
+
+# ----------------------------------------
+# BREEDING
+# ----------------------------------------
+
+def _schedule(resources, parameters, genes, scores):
+    """
+    Returns a schedule holding `genes` already evaluated to `scores`.
+    """
+    schedule = Schedule(resources, parameters)
+    schedule.days[:], schedule.hours[:], schedule.rooms[:] = genes
+    schedule.set_scores(scores)
+    return schedule
+
+
+def _breed(resources, parameters, seed, genes1, genes2, crossovers, mutations, mutation_size):
+    """
+    Returns the (children x 3 x slots) genes of children bred from `genes1` and `genes2`,
+    with a random generator seeded by `seed`.
+
+    A child without crossover copies its first parent.
+    """
+    rng = np.random.RandomState(int(seed))
+    layout = resources.layout
+    domains = lecture_domains(resources, parameters.week_days, parameters.daily_hours)
+
+    children = genes1.copy()
+    children[crossovers] = crossover(
+        genes1[crossovers], genes2[crossovers], layout, parameters.crossover_size, rng
+    )
+    children[mutations] = mutate(children[mutations], domains, mutation_size, rng)
+    return children
+
+
+def _evaluate_genes(resources, parameters, genes, cache: FitnessCache):
+    """
+    Returns the (schedules x scores) scores of (schedules x 3 x slots) `genes`.
+
+    Scores of genomes found in `cache` are reused, the rest are scored
+    together in a single batch and added to it.
+    """
+    scores = np.empty((len(genes), len(SCORES)))
+    pending = np.arange(len(genes))
+
+    digests = None
+    if cache.size > 0:
+        digests = [genome_digest(schedule_genes) for schedule_genes in genes]
+        cached = [cache.get(digest) for digest in digests]
+        hits = [idx for idx, schedule_scores in enumerate(cached) if schedule_scores is not None]
+        for idx in hits:
+            scores[idx] = cached[idx]
+        pending = np.setdiff1d(pending, hits)
+
+    if len(pending):
+        scores[pending] = resources.fitness_engine.evaluate_population(
+            genes[pending, 0], genes[pending, 1], genes[pending, 2],
+            parameters.week_days, parameters.daily_hours
+        )
+        if digests is not None:
+            for idx in pending:
+                cache.put(digests[idx], scores[idx])
+
+    return scores
+
+
+# resources shared by a worker process for its lifetime
+_worker = {}
+
+
+def _init_worker(resources, parameters):
+    _worker['resources'] = resources
+    _worker['parameters'] = parameters
+    _worker['cache'] = FitnessCache(parameters.cache_size)
+
+
+def _breed_task(task):
+    """
+    Breeds and evaluates a chunk of children in a worker process.
+
+    Returns the children's (children x 3 x slots) genes and (children x scores) scores,
+    with the hits and misses of the worker's cache while evaluating them.
+    """
+    resources, parameters, cache = _worker['resources'], _worker['parameters'], _worker['cache']
+    hits, misses = cache.hits, cache.misses
+
+    genes = _breed(resources, parameters, *task)
+    scores = _evaluate_genes(resources, parameters, genes, cache)
+    return genes, scores, cache.hits - hits, cache.misses - misses
@@ -0,0 +1,169 @@
+# -----------------------------------------------------------
+# This module represents an island model of GeneticAlgorithms.
+#
+# Each island evolves its own population in a separate process.
+# Every `migration_interval` generations, islands send their best
+# schedules to their neighbours, which replace their worst ones.
+#
+# Topologies:
+# (1) ring  (island i sends migrants to island i + 1)
+# (2) full  (every island sends migrants to every other island)
+#
+# The run stops as soon as any island reaches the optimum: that
+# island sets a shared event, and the others stop within a generation.
+# Islands share the model's `stop_event`, and each observes
+# the time limit itself.
+#
+#
+# (C) 2020 PyShoaib
+# -----------------------------------------------------------
+
+import copy
+from multiprocessing import Event, Pipe, Process
+
+import numpy as np
+
+from genetic_algorithm import GeneticAlgorithm, _schedule
+from parameters import Parameters
+from resources import Resources
+from solver import Solver
+
+TOPOLOGIES = ('ring', 'full')
+
+
+class IslandModel(Solver):
+    """
+    Runs `parameters.islands` GeneticAlgorithms with periodic migration.
+
+    Each step advances every island by `migration_interval` generations.
+    """
+
+    def __init__(self, resources: Resources, parameters: Parameters):
+        if parameters.migration_topology not in TOPOLOGIES:
+            raise ValueError(f'Unknown migration topology: {parameters.migration_topology}')
+
+        super().__init__(resources, parameters)
+
+        self._connections = []
+        self._processes = []
+        self._migrants = []
+
+    def step(self):
+        """
+        Advance every island by one migration interval.
+        """
+        self._reproduce()
+
+    def close(self):
+        """
+        Stop the island processes.
+        """
+        for connection in self._connections:
+            connection.send(None)
+            connection.close()
+        for process in self._processes:
+            process.join()
+
+        self._connections = []
+        self._processes = []
+
+    def _initialize(self):
+        """
+        Start an island process for each population.
+        """
+        optimum_event = Event()  # set by the first island reaching the optimum
+        for idx in range(self.parameters.islands):
+            parameters = copy.copy(self.parameters)
+            parameters.workers = 1  # islands breed in-process
+            if parameters.seed is not None:
+                parameters.seed += idx
+
+            connection, island_connection = Pipe()
+            process = Process(
+                target=_island,
+                args=(island_connection, self.resources, parameters, optimum_event, self.stop_event),
+                daemon=True
+            )
+            process.start()
+
+            self._connections.append(connection)
+            self._processes.append(process)
+
+        self._epoch(0, [None] * self.parameters.islands)
+
+    def _reproduce(self):
+        """
+        Migrate the best schedules, then evolve every island for one interval.
+        """
+        generations = min(
+            self.parameters.migration_interval,
+            self.parameters.maximum_generations - self.generation
+        )
+        self._epoch(generations, self._migrants)
+
+    def _epoch(self, generations, migrants):
+        for connection, island_migrants in zip(self._connections, migrants):
+            connection.send((generations, island_migrants))
+
+        reports = [connection.recv() for connection in self._connections]
+
+        self.generation = max(report[0] for report in reports)
+        self.optimum_reached = any(report[2] for report in reports)
+
+        best = int(np.argmax([report[1] for report in reports]))
+        if reports[best][1] > self.best_fitness or self.best_schedule is None:
+            genes, scores = reports[best][3]  # the island's best schedule
+            self.best_schedule = _schedule(self.resources, self.parameters, genes[0], scores[0])
+            self.best_fitness = reports[best][1]
+
+        # route each island's emigrants over the topology
+        emigrants = [report[4] for report in reports]
+        islands = len(emigrants)
+        if self.parameters.migration_topology == 'ring':
+            sources = [[(idx - 1) % islands] for idx in range(islands)]
+        else:
+            sources = [[src for src in range(islands) if src != idx] for idx in range(islands)]
+
+        self._migrants = [
+            (np.concatenate([emigrants[src][0] for src in island_sources]),
+             np.concatenate([emigrants[src][1] for src in island_sources]))
+            if island_sources and islands > 1 and self.parameters.migration_size > 0 else None
+            for island_sources in sources
+        ]
+
+
+def _island(connection, resources, parameters, optimum_event, stop_event=None):
+    """
+    Evolves a single island, driven by commands received over `connection`.
+
+    Each command (generations, migrants) is answered with
+    (generation, best_fitness, optimum_reached, best, emigrants).
+    """
+    ga = GeneticAlgorithm(resources, parameters)
+    ga.stop_event = stop_event
+    ga.initialize()
+
+    while True:
+        command = connection.recv()
+        if command is None:
+            break
+        generations, migrants = command
+
+        if migrants is not None:
+            ga.accept_migrants(*migrants)
+
+        for _ in range(generations):
+            if ga.optimum_reached:
+                optimum_event.set()
+            if optimum_event.is_set() or ga.stopped:
+                break
+            ga.step()
+        if ga.optimum_reached:
+            optimum_event.set()
+
+        connection.send((
+            ga.generation, ga.best_fitness, ga.optimum_reached,
+            ga.migrants(1), ga.migrants(parameters.migration_size)
+        ))
+
+    ga.close()
@@ -0,0 +1,173 @@
+# -----------------------------------------------------------
+# This module manages concurrent timetable generation jobs.
+#
+# Each generation request becomes a `Job` with its own ID.
+# Jobs wait in a bounded queue until one of a fixed pool of
+# worker threads runs them. Only the latest finished jobs are
+# kept, older ones are forgotten.
+#
+# Job statuses:
+# (1) queued      (waiting for a worker)
+# (2) generating  (running on a worker)
+# (3) generated   (finished, timetables attached)
+# (4) canceled    (stopped before finishing)
+# (5) failed      (stopped by an error)
+#
+#
+# (C) 2020 PyShoaib
+# -----------------------------------------------------------
+
+import queue
+import threading
+import uuid
+from collections import deque
+
+from parameters import Parameters
+
+
+class Job:
+    """
+    Represents a single timetable generation request.
+    """
+
+    def __init__(self, resources, engine: str, parameters: Parameters):
+        self.id = uuid.uuid4().hex
+        self.resources = resources
+        self.engine = engine
+        self.parameters = parameters
+
+        self.status = 'queued'
+        self.optimum_reached = False
+        self.timed_out = False
+        self.progress = 0.0  # best fitness so far
+        self.rates = {}
+        self.timetables = None
+
+        self.cancel_requested = False
+        self.subscribers = set()  # clients sent the job's progress
+
+    @property
+    def finished(self):
+        return self.status in ('generated', 'canceled', 'failed')
+
+    def __repr__(self):
+        return (
+            f'Job: {self.id}\n'
+            f'Engine: {self.engine}\n'
+            f'Status: {self.status}\n'
+            f'Progress: {self.progress}\n'
+        )
+
+
+class JobManager:
+    """
+    Runs jobs on `workers` threads, with at most `queue_size` jobs waiting.
+    Only the latest `retention` finished jobs are kept.
+
+    `target(job)` generates the timetables of a job, or only reports
+    the end of a job canceled while queued.
+    """
+
+    def __init__(self, target, workers: int = 1, queue_size: int = 8, retention: int = 16):
+        self.target = target
+        self.retention = retention
+
+        self._jobs = {}
+        self._finished = deque()  # IDs of finished jobs, oldest first
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+
+        for _ in range(workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def submit(self, resources, engine: str, parameters: Parameters):
+        """
+        Returns a new queued job, or None if the queue is full.
+        """
+        job = Job(resources, engine, parameters)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            return None
+
+        with self._lock:
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str):
+        """
+        Returns the job with `job_id`, or None.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        """
+        Request the job with `job_id` to stop.
+
+        Returns False if there is no such unfinished job.
+        """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+
+        job.cancel_requested = True
+        return True
+
+    def delete(self, job_id: str):
+        """
+        Forget the job with `job_id`, asking it to stop if unfinished.
+
+        Returns False if there is no such job.
+        """
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job_id in self._finished:
+                self._finished.remove(job_id)
+        if job is None:
+            return False
+
+        if not job.finished:
+            job.cancel_requested = True
+        return True
+
+    @property
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    # ----------------------------------------
+    # PRIVATE METHODS
+    # ----------------------------------------
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+                self._retain(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: Job):
+        if not job.cancel_requested:
+            job.status = 'generating'
+        try:
+            self.target(job)
+        except Exception as error:
+            print(f'Job {job.id} failed: {error!r}')
+            job.status = 'failed'
+            return
+
+        job.status = 'canceled' if job.cancel_requested else 'generated'
+
+    def _retain(self, job: Job):
+        """
+        Keep the finished `job` unless deleted, forgetting the oldest finished jobs beyond `retention`.
+        """
+        with self._lock:
+            if job.id not in self._jobs:
+                return
+            self._finished.append(job.id)
+            while len(self._finished) > self.retention:
+                self._jobs.pop(self._finished.popleft(), None)
@@ -0,0 +1,73 @@
+# -----------------------------------------------------------
+# This module repairs schedules by min-conflicts local search.
+#
+# Each step picks a random lecture violating any constraint,
+# such as a double-booked room or a noncurrent clash, and tries:
+# (1) `MOVES` random feasible room and time slots for it,
+# (2) a swap of its slots with a lecture of the same shape.
+# The best candidate is kept unless it lowers the fitness.
+#
+# Candidates are scored incrementally from the schedule's
+# tracked score contributions.
+#
+#
+# (C) 2020 PyShoaib
+# -----------------------------------------------------------
+
+import random
+
+import numpy as np
+
+from schedule import Schedule
+
+MOVES = 8  # random reassignments tried for a lecture per step
+
+
+def repair(schedule: Schedule, steps: int):
+    """
+    Improve `schedule` in place for at most `steps` steps,
+    or until no lecture violates a constraint.
+    """
+    if not schedule.incremental:
+        schedule.dirty_bit = True
+    schedule.calculate_fitness()
+
+    layout = schedule.layout
+    engine = schedule.resources.fitness_engine
+
+    for _ in range(steps):
+        violating = schedule.violating_lectures()
+        if len(violating) == 0:
+            break
+        idx = int(random.choice(violating))
+
+        candidates = [([idx], ())] * MOVES
+
+        # swap with a lecture of the same duration and kind
+        similar = np.flatnonzero(
+            (layout.durations == layout.durations[idx]) & (layout.is_lab == layout.is_lab[idx])
+        )
+        other = int(random.choice(similar))
+        if other != idx:
+            rows, other_rows = engine.slots_of(np.array([idx])), engine.slots_of(np.array([other]))
+            candidates.append(([idx, other], tuple(
+                np.concatenate([genes[other_rows], genes[rows]])
+                for genes in (schedule.days, schedule.hours, schedule.rooms)
+            )))
+
+        best, best_fitness = None, schedule.fitness
+        for lecture_idxs, genes in candidates:
+            old_genes = schedule.reassign(lecture_idxs, *genes)
+            schedule.calculate_fitness()
+
+            if schedule.fitness >= best_fitness:
+                rows = engine.slots_of(np.array(lecture_idxs))
+                best = lecture_idxs, (schedule.days[rows], schedule.hours[rows], schedule.rooms[rows])
+                best_fitness = schedule.fitness
+
+            schedule.reassign(lecture_idxs, *old_genes)
+            schedule.calculate_fitness()
+
+        if best is not None:
+            schedule.reassign(best[0], *best[1])
+            schedule.calculate_fitness()
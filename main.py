@@ -1,12 +1,15 @@
+import os
+import sys
 import time
 import json
 from json import JSONDecodeError
-from multiprocessing.dummy import Process
 from flask import Flask
 from flask_sockets import Sockets
 # Local Imports
 from resources_parser import extract_resources
-from genetic_algorithm import GeneticAlgorithm
+from fitness import SCORES
+from generation import ENGINES, Generation
+from jobs import Job, JobManager
 from parameters import Parameters
 
 # App settings
@@ -14,17 +17,19 @@ app = Flask(__name__)
 sockets = Sockets(app)
 
 # Global Variables
-generating = False  # Currently busy
-generated = False  # Waiting for user to get
-timetables = None  # Generated timetables
-timetables_progresses = 0  # Current timetables progress
-clients = None  # Reference to all the clients connected
-thread = None  # Track generation
+jobs = None  # Generation jobs, see the bottom of this module
+
+# Generation workers, and jobs allowed to wait for one
+GENERATION_WORKERS = int(os.environ.get('GENERATION_WORKERS', 2))
+GENERATION_QUEUE_SIZE = int(os.environ.get('GENERATION_QUEUE_SIZE', 8))
+GENERATION_RETENTION = int(os.environ.get('GENERATION_RETENTION', 16))  # finished jobs kept
+
+POLL_INTERVAL = 0.1  # seconds between reads of a generation's progress
+MAXIMUM_GENERATIONS = 100  # generations of a run without a time limit
 
 # Only one endpoint for everything
 @sockets.route('/connect')
 def connect(ws):
-    global clients
     while not ws.closed:
         request_string = ws.receive()
         if request_string is None:  # message is "None" if the client has closed.
@@ -32,22 +37,30 @@ def connect(ws):
         try:
             request_json = json.loads(request_string)
             message = request_json['message']
-            clients = ws.handler.server.clients.values()
+            job_id = request_json.get('jobId')
             # Respond to client based on message
             if message == 'get-generating':
-                response = get_generating()
+                response = get_generating(job_id, ws)
             elif message == 'generate-timetables':
                 response = generate_timetables(
-                    extract_resources(request_json['timetableRequest'])
+                    extract_resources(request_json['timetableRequest']),
+                    request_json.get('engine', 'genetic'),
+                    request_json.get('timeLimit', 0),
+                    request_json.get('islands'),
+                    ws
                 )
+            elif message == 'subscribe-progress':
+                response = subscribe_progress(job_id, ws)
+            elif message == 'unsubscribe-progress':
+                response = unsubscribe_progress(job_id, ws)
             elif message == 'get-timetables-progress':
-                response = get_timetables_progresses()
+                response = get_timetables_progresses(job_id)
             elif message == 'cancel-generation':
-                response = cancel_generation()
+                response = cancel_generation(job_id)
             elif message == 'get-timetables':
-                response = get_timetables()
+                response = get_timetables(job_id)
             elif message == 'delete-timetables':
-                response = delete_timetables()
+                response = delete_timetables(job_id)
             elif message == 'prevent-timeout':
                 continue
             else:
@@ -60,172 +73,277 @@ def connect(ws):
                 "code": 400,
                 "message": "could-not-parse-json"
             }
-        broadcast_to_clients(response)
+        send_to_clients([ws], response)
 
+    for job in jobs.jobs:
+        job.subscribers.discard(ws)
 
-# Send the message to all clients connected to this webserver
-# process. (To support multiple processes or instances, an
-# extra-instance storage or messaging system would be required.)
-def broadcast_to_clients(response):
-    global clients
+
+# Send the message to `clients` only, encoded once for all.
+# Progress of a job goes to the clients subscribed to it.
+def send_to_clients(clients, response):
     try:
-        for client in clients:
-            client.ws.send(json.dumps(response))
+        payload = json.dumps(response)
     except TypeError:
-        print('Type Error: ' + json.dumps(response))
-    except:
-        print("Some error happened while sending stuff to clients")
+        print('Type Error: ' + repr(response))
+        return
+    for client in clients:
+        try:
+            client.send(payload)
+        except:
+            print("Some error happened while sending stuff to clients")
+
+
+def publish(job: Job, response):
+    send_to_clients([client for client in list(job.subscribers) if not client.closed], response)
+
+
+def job_not_found(job_id):
+    return {
+        "code": 404,
+        "message": 'job-not-found',
+        "jobId": job_id
+    }
+
+
+def generation_failed(job: Job, error):
+    return {
+        "code": 500,
+        "message": 'generation-failed',
+        "jobId": job.id,
+        "error": error
+    }
 
 
-def get_generating():
+def get_generating(job_id=None, client=None):
+    if job_id is None:
+        # only jobs the client submitted or subscribed to are listed
+        return {
+            "code": 200,
+            "message": 'attached-is-generating-status',
+            "generating": any(job.status == 'generating' for job in jobs.jobs),
+            "jobs": [
+                {"jobId": job.id, "status": job.status}
+                for job in jobs.jobs if client in job.subscribers
+            ]
+        }
+    job = jobs.get(job_id)
+    if job is None:
+        return job_not_found(job_id)
     return {
         "code": 200,
         "message": 'attached-is-generating-status',
-        "generating": generating
+        "jobId": job.id,
+        "generating": job.status == 'generating',
+        "status": job.status
     }
 
 
-def get_timetables_progresses():
+def get_timetables_progresses(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return job_not_found(job_id)
     return {
         "code": 200,
         "message": 'attached-are-timetables-progresses',
-        "timetablesProgresses": timetables_progresses
+        "jobId": job.id,
+        "timetablesProgresses": job.progress,
+        "rates": job.rates
     }
 
 
-def generate_in_background(resources):
-    global generating
-    global generated
-    global timetables
-    global timetables_progresses
-    ga = GeneticAlgorithm(resources, Parameters(10, 100, 0.1))
-    time.sleep(0)
-    ga._initialize()
-    while(
-        ga.optimum_reached == False and
-        ga.generation < ga.parameters.maximum_generations
-    ):
-        ga._reproduce()
-        time.sleep(0)
-        timetables_progresses = ga.best_fitness
-        ga.best_schedule.save_slots()
-        timetables = [ga.resources.entries]
-        broadcast_to_clients({
-            "code": 201,
-            "message": 'attached-are-timetables-progresses',
-            "timetablesProgresses": timetables_progresses,
-            "timetables": timetables
+def generate_in_background(job: Job):
+    if job.cancel_requested:  # while queued
+        publish(job, {
+            "code": 200,
+            "message": 'canceled-timetables-generation',
+            "jobId": job.id
         })
-        ga.generation += 1
-    ga.best_schedule.save_slots()
-    timetables = [ga.resources.entries]
-    generated = True
-    if ga.optimum_reached:
-        broadcast_to_clients({
+        return
+
+    generation = Generation(job.resources, job.engine, job.parameters)
+    try:
+        while not generation.finished:
+            time.sleep(POLL_INTERVAL)
+            if job.cancel_requested:
+                generation.cancel()
+            changes = generation.poll()
+            job.progress = generation.best_fitness
+            if changes is None:
+                continue
+
+            # only lectures assigned other slots since the last progress
+            job.rates = generation.rates
+            publish(job, {
+                "code": 201,
+                "message": 'attached-are-timetables-progresses',
+                "jobId": job.id,
+                "generation": generation.generation,
+                "timetablesProgresses": job.progress,
+                "scores": dict(zip(SCORES, generation.scores)),
+                "rates": job.rates,
+                "changes": [
+                    {"lectureId": lecture_id, "assignedSlots": slots}
+                    for lecture_id, slots in changes.items()
+                ]
+            })
+    except Exception as error:
+        publish(job, generation_failed(job, repr(error)))
+        raise
+    finally:
+        generation.cancel()  # stops the child if polling failed
+        generation.close()
+
+    if generation.error is not None:
+        publish(job, generation_failed(job, generation.error))
+        raise RuntimeError(generation.error)
+
+    job.progress = generation.best_fitness
+    job.timetables = [job.resources.entries]
+    job.optimum_reached = generation.optimum_reached
+    job.timed_out = generation.timed_out
+    if job.cancel_requested:
+        publish(job, {
+            "code": 200,
+            "message": 'canceled-timetables-generation',
+            "jobId": job.id
+        })
+    elif generation.optimum_reached:
+        publish(job, {
             "code": 200,
             "message": 'attached-are-timetables',
-            "timetables": timetables
+            "jobId": job.id,
+            "timetables": job.timetables
+        })
+    elif generation.timed_out:
+        publish(job, {
+            "code": 200,
+            "message": 'time-limit-reached',
+            "jobId": job.id,
+            "timetables": job.timetables
         })
     else:
-        broadcast_to_clients({
+        publish(job, {
             "code": 500,
             "message": 'max-generations-reached',
-            "timetables": timetables
+            "jobId": job.id,
+            "timetables": job.timetables
         })
-    generating = False
 
 
-def generate_timetables(resources):
-    global thread
-    global generating
-    if generating:
+def generate_timetables(resources, engine='genetic', time_limit=0, islands=None, client=None):
+    if engine not in ENGINES:
         return {
-            "code": 300,
-            "message": 'generating-timetables'
+            "code": 400,
+            "message": 'unknown-engine'
         }
-    if generated:
+    # with a time limit, the best schedule found in time is returned
+    parameters = Parameters(
+        10, MAXIMUM_GENERATIONS if not time_limit else sys.maxsize, 0.1,
+        adaptive=True, time_limit=time_limit
+    )
+    if engine == 'islands':
+        # by default, the cores are shared by the jobs generating at once
+        parameters.islands = islands or max(2, (os.cpu_count() or 1) // GENERATION_WORKERS)
+    job = jobs.submit(resources, engine, parameters)
+    if job is None:
         return {
-            "code": 301,
-            "message": 'timetables-have-been-generated'
+            "code": 503,
+            "message": 'generation-queue-full'
         }
-    # Starting generating
-    generating = True
-    timetables_progresses = 0
-    thread = Process(
-        target=generate_in_background,
-        kwargs={
-            'resources': resources
-        }
-    )
-    thread.start()
+    # the requesting client follows its job's progress
+    if client is not None:
+        job.subscribers.add(client)
     return {
         "code": 201,
-        "message": 'started-generating-timetables'
+        "message": 'started-generating-timetables',
+        "jobId": job.id
     }
 
 
-def get_timetables():
-    global timetables
-    if generating:
+def subscribe_progress(job_id, client):
+    job = jobs.get(job_id)
+    if job is None:
+        return job_not_found(job_id)
+    job.subscribers.add(client)
+    return {
+        "code": 200,
+        "message": 'subscribed-to-progress',
+        "jobId": job.id
+    }
+
+
+def unsubscribe_progress(job_id, client):
+    job = jobs.get(job_id)
+    if job is None:
+        return job_not_found(job_id)
+    job.subscribers.discard(client)
+    return {
+        "code": 200,
+        "message": 'unsubscribed-from-progress',
+        "jobId": job.id
+    }
+
+
+def get_timetables(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return job_not_found(job_id)
+    if not job.finished:
+        # the best timetables so far, kept up to date by progress changes
         return {
             "code": 302,
-            "message": 'generating-timetables'
+            "message": 'generating-timetables',
+            "jobId": job.id,
+            "timetables": [job.resources.entries] if job.status == 'generating' else None
         }
-    if generated:
+    if job.status == 'generated':
         return {
             "code": 201,
             "message": 'attached-are-timetables',
-            "timetables": timetables
+            "jobId": job.id,
+            "timetables": job.timetables
         }
     return {
         "code": 404,
-        "message": 'no-generated-timetables-found'
+        "message": 'no-generated-timetables-found',
+        "jobId": job.id
     }
 
 
-def cancel_generation():
-    if (thread and thread.is_alive()):
-        try:
-            thread.terminate()
-            return {
-                "code": 200,
-                "message": 'canceled-timetables-generation'
-            }
-        except:
-            return {
-                "code": 400,
-                "message": 'could-not-cancel-generation'
-            }
-    else:
+def cancel_generation(job_id):
+    if jobs.cancel(job_id):
         return {
-            "code": 401,
-            "message": 'could-not-cancel-generation'
+            "code": 200,
+            "message": 'canceling-timetables-generation',
+            "jobId": job_id
         }
+    return {
+        "code": 401,
+        "message": 'could-not-cancel-generation',
+        "jobId": job_id
+    }
 
 
-def delete_timetables():
-    global generated
-    global timetables_progresses
-    if generating:
-        # TODO: Stop generating
-        return {
-            "code": 304,
-            "message": 'generating-timetables'
-        }
-    if generated:
-        generated = False
-        timetables_progresses = 0
-        timetables = None
-        return {
-            "code": 203,
-            "message": 'deleted-timetables'
-        }
+def delete_timetables(job_id):
+    # an unfinished job is stopped first
+    if not jobs.delete(job_id):
+        return job_not_found(job_id)
     return {
-        "code": 405,
-        "message": 'no-generated-timetables-found'
+        "code": 203,
+        "message": 'deleted-timetables',
+        "jobId": job_id
     }
 
 
+jobs = JobManager(
+    generate_in_background,
+    workers=GENERATION_WORKERS,
+    queue_size=GENERATION_QUEUE_SIZE,
+    retention=GENERATION_RETENTION
+)
+
+
 if __name__ == '__main__':
     print("""
             This can not be run directly because the Flask development server does not
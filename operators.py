@@ -0,0 +1,87 @@
+# -----------------------------------------------------------
+# This module provides genetic operators over gene matrices.
+#
+# A population is a single (schedules x 3 x slots) integer
+# matrix holding the days, hours and rooms of every slot, as
+# laid out by a `SlotLayout`. Each operator produces all its
+# schedules at once:
+# (1) random_genes  (random feasible room and time slots, labs kept contiguous)
+# (2) crossover     (each lecture copied from either parent)
+# (3) mutate        (a fixed fraction of lectures reassigned)
+#
+# Operators draw from `rng`, the global NumPy generator or a
+# `np.random.RandomState`.
+#
+#
+# (C) 2020 PyShoaib
+# -----------------------------------------------------------
+
+import numpy as np
+
+from constraints import LectureDomains
+from resources import SlotLayout
+
+
+def random_genes(domains: LectureDomains, count: int, rng=np.random):
+    """
+    Returns (count x 3 x slots) genes with random feasible room and time slots for each lecture.
+
+    Slots of a theory lecture fall on distinct days, slots of a lab
+    share a day and a room over consecutive hours.
+    """
+    layout = domains.layout
+    lectures = layout.slot_lectures
+    positions = np.arange(layout.size) - layout.offsets[lectures]
+    genes = np.empty((count, 3, layout.size), dtype=np.int32)
+
+    # theory: a feasible day without replacement, hour and room for each slot
+    theory = np.flatnonzero(~layout.is_lab[lectures])
+    theory_lectures = np.broadcast_to(lectures[theory], (count, len(theory)))
+    day_keys = rng.random_sample((count, len(layout.lecture_ids), domains.week_days)) + ~domains.days
+    days = np.argsort(day_keys, axis=2)[:, lectures[theory], positions[theory]]
+    genes[:, 0, theory] = days
+    genes[:, 1, theory] = domains.sample_hours(theory_lectures, days, rng.random_sample(days.shape))
+    genes[:, 2, theory] = domains.sample_rooms(theory_lectures, rng.random_sample(days.shape))
+
+    # lab: a feasible day, starting hour and room for each lecture
+    lab_idxs = np.flatnonzero(layout.is_lab)
+    labs = np.flatnonzero(layout.is_lab[lectures])
+    lab_lectures = np.broadcast_to(lab_idxs, (count, len(lab_idxs)))
+    days, starts = domains.sample_starts(lab_lectures, rng.random_sample(lab_lectures.shape))
+    rooms = domains.sample_rooms(lab_lectures, rng.random_sample(lab_lectures.shape))
+    owners = np.searchsorted(lab_idxs, lectures[labs])
+    genes[:, 0, labs] = days[:, owners]
+    genes[:, 1, labs] = starts[:, owners] + positions[labs]
+    genes[:, 2, labs] = rooms[:, owners]
+
+    return genes
+
+
+def crossover(genes1, genes2, layout: SlotLayout, size: float, rng=np.random):
+    """
+    Returns children copying each lecture from `genes1` with probability `size`,
+    otherwise from `genes2`.
+    """
+    from_parent1 = rng.random_sample((len(genes1), len(layout.lecture_ids))) < size
+    return np.where(from_parent1[:, np.newaxis, layout.slot_lectures], genes1, genes2)
+
+
+def mutate(genes, domains: LectureDomains, size: float, rng=np.random):
+    """
+    Returns `genes` with `size` of the lectures of each schedule reassigned at random.
+    """
+    layout = domains.layout
+    lectures_count = len(layout.lecture_ids)
+    moved = sample_lectures(len(genes), lectures_count, int(size * lectures_count), rng)
+    fresh = random_genes(domains, len(genes), rng)
+    return np.where(moved[:, np.newaxis, layout.slot_lectures], fresh, genes)
+
+
+def sample_lectures(count: int, lectures_count: int, sample: int, rng=np.random):
+    """
+    Returns a (count x lectures) mask with `sample` random lectures set in each row.
+    """
+    picked = np.argsort(rng.random_sample((count, lectures_count)), axis=1)[:, :sample]
+    mask = np.zeros((count, lectures_count), dtype=bool)
+    mask[np.arange(count)[:, np.newaxis], picked] = True
+    return mask
@@ -10,6 +10,28 @@
 # (6) crossover_size        (skew of copying information from parents)
 # (7) week_days             (number of days University is open)
 # (8) daily_hours           (number of hours University is open)
+# (9) workers               (processes breeding offspring, 1 to breed in-process)
+# (10) seed                 (seed of random generators, None for a random run)
+# (11) islands              (populations evolved in separate processes)
+# (12) migration_interval   (generations between migrations across islands)
+# (13) migration_size       (best schedules sent by an island per migration)
+# (14) migration_topology   (islands receiving migrants, 'ring' or 'full')
+# (15) cache_size           (scores memoized by genome, 0 to disable)
+# (16) selection            (parent selection, 'tournament', 'rank' or 'stochastic_universal')
+# (17) greedy_fraction      (initial schedules built greedily, the rest are random)
+# (18) repair_steps         (local search steps per repaired schedule, 0 to disable)
+# (19) repair_fraction      (best schedules repaired each generation, at least the elite)
+# (20) temperature          (initial temperature of simulated annealing)
+# (21) cooling_rate         (temperature kept after each annealing generation)
+# (22) tabu_tenure          (generations a moved lecture stays tabu)
+# (23) replacement          (population update, 'generational' or 'steady_state')
+# (24) offspring_size       (offspring per generation in steady_state replacement)
+# (25) cull_duplicates      (replace repeated genomes with random schedules)
+# (26) stagnation_limit     (generations without improvement before a restart, 0 to disable)
+# (27) restart_fraction     (worst schedules replaced by a restart)
+# (28) restart_mode         (restarted schedules, 'restart' at random or 'hypermutation')
+# (29) adaptive             (adjust mutation and crossover rates during the run)
+# (30) time_limit           (seconds after which the run stops with its best schedule, 0 to disable)
 #
 #
 # (C) 2020 PyShoaib
@@ -31,7 +53,29 @@ class Parameters:
             crossover_size: float = 0.50,
             selection_pressure: int = 4,
             week_days: int = 5,
-            daily_hours: int = 8
+            daily_hours: int = 8,
+            workers: int = 1,
+            seed: int = None,
+            islands: int = 1,
+            migration_interval: int = 10,
+            migration_size: int = 1,
+            migration_topology: str = 'ring',
+            cache_size: int = 0,
+            selection: str = 'tournament',
+            greedy_fraction: float = 0.0,
+            repair_steps: int = 0,
+            repair_fraction: float = 0.0,
+            temperature: float = 1.0,
+            cooling_rate: float = 0.99,
+            tabu_tenure: int = 10,
+            replacement: str = 'generational',
+            offspring_size: int = 2,
+            cull_duplicates: bool = True,
+            stagnation_limit: int = 0,
+            restart_fraction: float = 0.5,
+            restart_mode: str = 'restart',
+            adaptive: bool = False,
+            time_limit: float = 0
     ):
         self.population_size = population_size
         self.maximum_generations = maximum_generations
@@ -42,6 +86,28 @@ class Parameters:
         self.selection_pressure = selection_pressure
         self.week_days = week_days
         self.daily_hours = daily_hours
+        self.workers = workers
+        self.seed = seed
+        self.islands = islands
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+        self.migration_topology = migration_topology
+        self.cache_size = cache_size
+        self.selection = selection
+        self.greedy_fraction = greedy_fraction
+        self.repair_steps = repair_steps
+        self.repair_fraction = repair_fraction
+        self.temperature = temperature
+        self.cooling_rate = cooling_rate
+        self.tabu_tenure = tabu_tenure
+        self.replacement = replacement
+        self.offspring_size = offspring_size
+        self.cull_duplicates = cull_duplicates
+        self.stagnation_limit = stagnation_limit
+        self.restart_fraction = restart_fraction
+        self.restart_mode = restart_mode
+        self.adaptive = adaptive
+        self.time_limit = time_limit
 
     def __repr__(self):
         return (
@@ -54,4 +120,26 @@ class Parameters:
             f'Selection Pressure: {self.selection_pressure}\n'
             f'Weekdays: {self.week_days}\n'
             f'Daily hours: {self.daily_hours}\n'
+            f'Workers: {self.workers}\n'
+            f'Seed: {self.seed}\n'
+            f'Islands: {self.islands}\n'
+            f'Migration Interval: {self.migration_interval}\n'
+            f'Migration Size: {self.migration_size}\n'
+            f'Migration Topology: {self.migration_topology}\n'
+            f'Cache Size: {self.cache_size}\n'
+            f'Selection: {self.selection}\n'
+            f'Greedy Fraction: {self.greedy_fraction}\n'
+            f'Repair Steps: {self.repair_steps}\n'
+            f'Repair Fraction: {self.repair_fraction}\n'
+            f'Temperature: {self.temperature}\n'
+            f'Cooling Rate: {self.cooling_rate}\n'
+            f'Tabu Tenure: {self.tabu_tenure}\n'
+            f'Replacement: {self.replacement}\n'
+            f'Offspring Size: {self.offspring_size}\n'
+            f'Cull Duplicates: {self.cull_duplicates}\n'
+            f'Stagnation Limit: {self.stagnation_limit}\n'
+            f'Restart Fraction: {self.restart_fraction}\n'
+            f'Restart Mode: {self.restart_mode}\n'
+            f'Adaptive: {self.adaptive}\n'
+            f'Time Limit: {self.time_limit}\n'
         )
@@ -7,6 +7,7 @@
 # (3) Teachers
 # (4) Sections
 # (5) Lectures
+# (6) SlotLayout
 #
 #
 # (C) 2020 PyShoaib
@@ -22,8 +23,13 @@ class Room:
     Rooms specify certain time slots when they can be used.
     """
 
+    __slots__ = (
+        'id', 'index', 'name', 'capacity', 'available_slots'
+    )
+
     def __init__(self, room):
         self.id = room['id']
+        self.index = None  # dense index, set by `Resources.index_entities`
         self.name = room['name']
         self.capacity = room['capacity']
 
@@ -45,8 +51,16 @@ class Course:
     Courses impose room and time slot constraints on their lectures.
     """
 
+    __slots__ = (
+        'id', 'index', 'course_code', 'title', 'department', 'duration',
+        'theory_course_id', 'is_core_course', 'is_lab_course',
+        'elective_pair_ids', 'prerequisite_ids',
+        'available_room_ids', 'available_slots',
+    )
+
     def __init__(self, course):
         self.id = course['id']
+        self.index = None  # dense index, set by `Resources.index_entities`
         self.course_code = course['courseCode']
         self.title = course['title']
         self.department = course['department']
@@ -80,8 +94,13 @@ class Teacher:
     Teachers impose room and time slot constraints on their lectures.
     """
 
+    __slots__ = (
+        'id', 'index', 'name', 'department', 'lecture_ids', 'available_room_ids', 'available_slots'
+    )
+
     def __init__(self, teacher):
         self.id = teacher['id']
+        self.index = None  # dense index, set by `Resources.index_entities`
         self.name = teacher['name']
         self.department = teacher['department']
 
@@ -106,8 +125,13 @@ class Section:
     Sections impose room constraints on thier lectures.
     """
 
+    __slots__ = (
+        'id', 'index', 'name', 'batch', 'department', 'lecture_ids'
+    )
+
     def __init__(self, section):
         self.id = section['id']
+        self.index = None  # dense index, set by `Resources.index_entities`
         self.name = section['name']
         self.batch = section['batch']
         self.department = section['department']
@@ -132,8 +156,14 @@ class Lecture:
     Constraints of involved teachers and sections are also followed.
     """
 
+    __slots__ = (
+        'id', 'index', 'name', 'strength',
+        'course_id', 'teacher_ids', 'section_ids', 'assigned_slots',
+    )
+
     def __init__(self, lecture):
         self.id = lecture['id']
+        self.index = None  # dense index, set by `Resources.index_entities`
         self.name = lecture['name']
         self.strength = lecture['strength']
 
@@ -142,9 +172,6 @@ class Lecture:
         self.teacher_ids = lecture['teacherIds']
         self.section_ids = lecture['atomicSectionIds']
 
-        # clashing lectures
-        self.noncurrent_lecture_ids = set()
-
         # assigned slots [used for frontend serialization]
         self.assigned_slots = list()
 
@@ -167,7 +194,46 @@ class Lecture:
             f'Course ID: {self.course_id}\n'
             f'Teachers ID: {self.teacher_ids}\n'
             f'Sections ID: {self.section_ids}\n'
-            f'Noncurrent Lectures ID: {self.noncurrent_lecture_ids}\n'
+        )
+
+
+class SlotLayout:
+    """
+    Maps each lecture slot to a fixed row of a schedule's gene arrays.
+
+    Lectures occupy `duration` contiguous rows starting at their offset.
+    """
+
+    def __init__(self, resources: 'Resources'):
+        self.room_ids = resources.room_ids
+        self.lecture_ids = resources.lecture_ids
+
+        courses = [
+            resources.courses[resources.lectures[lecture_id].course_id]
+            for lecture_id in self.lecture_ids
+        ]
+        durations = np.array([course.duration for course in courses], dtype=np.int32)
+
+        # lecture `idx` owns rows [offsets[idx], offsets[idx + 1])
+        self.offsets = np.zeros(len(courses) + 1, dtype=np.int32)
+        np.cumsum(durations, out=self.offsets[1:])
+
+        self.durations = durations
+        self.is_lab = np.array([course.is_lab_course for course in courses], dtype=bool)
+
+        # lecture index of every row
+        self.slot_lectures = np.repeat(
+            np.arange(len(courses), dtype=np.int32), durations
+        )
+
+    @property
+    def size(self):
+        return int(self.offsets[-1])
+
+    def __repr__(self):
+        return (
+            f'Lectures: {len(self.lecture_ids)}\n'
+            f'Slots: {self.size}\n'
         )
 
 
@@ -183,6 +249,45 @@ class Resources:
         self.sections = {}
         self.lectures = {}
 
+        # external IDs of entities by dense index
+        self.room_ids = []
+        self.course_ids = []
+        self.teacher_ids = []
+        self.section_ids = []
+        self.lecture_ids = []
+
+        # noncurrent lectures, by dense lecture index
+        self.clashes = None
+
+        # row layout of lecture slots in a schedule's gene arrays
+        self.layout = None
+
+        # dense lookup tables of lectures' constraints
+        self.constraints = None
+
+        # feasible slots of lectures, built for a week by `lecture_domains`
+        self.domains = None
+
+        # scores schedules against these resources
+        self.fitness_engine = None
+
+    def index_entities(self):
+        """
+        Assign contiguous indices to all entities, in insertion order.
+
+        `entity.index` maps an external ID to its index, and `*_ids` map back.
+        """
+        for entities, ids in (
+                (self.rooms, self.room_ids),
+                (self.courses, self.course_ids),
+                (self.teachers, self.teacher_ids),
+                (self.sections, self.section_ids),
+                (self.lectures, self.lecture_ids),
+        ):
+            ids[:] = entities.keys()
+            for idx, entity in enumerate(entities.values()):
+                entity.index = idx
+
     @property
     def entries(self):
         return [lecture.to_dict() for lecture in self.lectures.values()]
@@ -14,12 +14,50 @@
 
 import json
 
-from clashes import set_lectures_noncurrency
+from clashes import build_clash_graph
+from constraints import ConstraintModel
+from fitness import FitnessEngine
 from parameters import *
 from resources import *
 from resources import Resources
 
 
+# Keys read by `extract_parameters`, in the order of `Parameters`
+PARAMETERS = (
+    'population_size',
+    'maximum_generations',
+    'mutation_rate',
+    'mutation_size',
+    'crossover_rate',
+    'crossover_size',
+    'selection_pressure',
+    'week_days',
+    'daily_hours',
+    'workers',
+    'seed',
+    'islands',
+    'migration_interval',
+    'migration_size',
+    'migration_topology',
+    'cache_size',
+    'selection',
+    'greedy_fraction',
+    'repair_steps',
+    'repair_fraction',
+    'temperature',
+    'cooling_rate',
+    'tabu_tenure',
+    'replacement',
+    'offspring_size',
+    'cull_duplicates',
+    'stagnation_limit',
+    'restart_fraction',
+    'restart_mode',
+    'adaptive',
+    'time_limit',
+)
+
+
 def read_json(json_file):
     """
     Reads resources from `json_file`.
@@ -75,7 +113,15 @@ def extract_resources(serial_resources):
             course = resources.courses[course_id]
             course.elective_pair_ids.add(serial_elective['id'])
 
-    set_lectures_noncurrency(resources)  # set lectures' noncurrency
+    resources.index_entities()  # map external IDs to dense indices
+
+    resources.clashes = build_clash_graph(resources)  # set lectures' noncurrency
+
+    resources.layout = SlotLayout(resources)  # fix gene rows of lecture slots
+
+    resources.constraints = ConstraintModel(resources)  # build constraint lookup tables
+
+    resources.fitness_engine = FitnessEngine(resources)
 
     return resources
 
@@ -93,14 +139,7 @@ def read_parameters(json_file):
 
 
 def extract_parameters(serial_parameters):
-    return Parameters(
-        population_size=serial_parameters.get('population_size'),
-        maximum_generations=serial_parameters.get('maximum_generations'),
-        mutation_rate=serial_parameters.get('mutation_rate'),
-        mutation_size=serial_parameters.get('mutation_size'),
-        crossover_rate=serial_parameters.get('crossover_rate'),
-        crossover_size=serial_parameters.get('crossover_size'),
-        selection_pressure=serial_parameters.get('selection_pressure'),
-        week_days=serial_parameters.get('week_days'),
-        daily_hours=serial_parameters.get('daily_hours'),
-    )
+    # parameters missing from the JSON keep their defaults
+    return Parameters(**{
+        name: serial_parameters[name] for name in PARAMETERS if name in serial_parameters
+    })
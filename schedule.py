@@ -14,8 +14,10 @@
 import random
 from functools import total_ordering
 
-from pandas import Series, DataFrame
+import numpy as np
 
+from constraints import lecture_domains
+from fitness import SCORES, genome_digest
 from parameters import Parameters
 from resources import *
 
@@ -26,54 +28,84 @@ class Schedule:
     Represents a weekly schedule.
 
     Requires a `Resources` object and a `Parameters` object.
+
+    Genes are stored as fixed-length integer arrays `days`, `hours`,
+    `rooms` (room index) and `lectures` (lecture index), one row per
+    lecture slot as laid out by `resources.layout`.
     """
 
     def __init__(self, resources: Resources, parameters: Parameters):
         self.resources = resources
         self.parameters = parameters
+        self.layout: SlotLayout = resources.layout
+        self.domains = lecture_domains(resources, parameters.week_days, parameters.daily_hours)
 
         self.fitness = 0.0
         self.dirty_bit = False  # indicate current fitness is obsolete
 
-        self.scores = Series(
-            index=['unique_slots',
-                   'capacity_rooms',
-                   'course_slots', 'course_rooms',
-                   'teacher_slots', 'teacher_rooms',
-                   'lecture_slots', ],
-            data=0
-        )
+        self.scores = np.zeros(len(SCORES))  # ordered as `fitness.SCORES`
 
         # data structure for the actual schedule
-        self.entries = DataFrame(columns=['day', 'hour', 'room_id', 'lecture_id'])
+        size = self.layout.size
+        self.days = np.zeros(size, dtype=np.int32)
+        self.hours = np.zeros(size, dtype=np.int32)
+        self.rooms = np.zeros(size, dtype=np.int32)
+        self.lectures = self.layout.slot_lectures  # fixed, shared by all schedules
+
+        # score contributions kept up to date across mutations
+        self._state = None
 
     def initialize(self):
         """
         Assign random room and time slots to each lecture.
 
-        Constraints are not considered in this step.
+        Slots are drawn from each lecture's feasible domain,
+        clashes are not considered in this step.
         """
-        for lecture in self.resources.lectures.values():
-            self._assign_lecture(lecture)
+        for idx in range(len(self.layout.lecture_ids)):
+            self._assign_lecture(idx)
 
+        self._state = None
         self.dirty_bit = True  # indicate current fitness is obsolete
 
     def mutate(self):
         """
         Reassign room and time slots of a (small) subset of lecture.
 
+        Fitness of the schedule must be re-evaluated after this step.
+        Only the reassigned lectures and their noncurrent lectures are re-scored.
+        """
+        lectures_count = len(self.layout.lecture_ids)
+        sample = int(self.parameters.mutation_size * lectures_count)
+        self.reassign(random.sample(range(lectures_count), sample))
+
+    def reassign(self, lecture_idxs, days=None, hours=None, rooms=None):
+        """
+        Assign `days`, `hours` and `rooms` to the slots of lectures at `lecture_idxs`,
+        or random feasible room and time slots if omitted.
+
+        Returns the previous days, hours and rooms of those slots.
         Fitness of the schedule must be re-evaluated after this step.
         """
-        sample = int(self.parameters.mutation_size * len(self.resources.lectures))
-        target_ids = random.sample(self.resources.lectures.keys(), sample)
+        engine = self.resources.fitness_engine
+        rows = engine.slots_of(np.asarray(lecture_idxs, dtype=np.int32))
+        old_days, old_hours, old_rooms = self.days[rows], self.hours[rows], self.rooms[rows]
 
-        self._remove_lectures(target_ids)
+        if days is None:
+            for idx in lecture_idxs:
+                self._assign_lecture(idx)
+        else:
+            self.days[rows], self.hours[rows], self.rooms[rows] = days, hours, rooms
 
-        for lecture_id in target_ids:
-            lecture = self.resources.lectures[lecture_id]
-            self._assign_lecture(lecture)
+        if self._state is not None:
+            engine.update_state(
+                self._state, lecture_idxs, old_days, old_hours, old_rooms,
+                self.days, self.hours, self.rooms,
+                self.parameters.week_days, self.parameters.daily_hours
+            )
 
         self.dirty_bit = True  # indicate current fitness is obsolete
+        return old_days, old_hours, old_rooms
 
     def crossover(self, parent1: 'Schedule', parent2: 'Schedule'):
         """
@@ -81,25 +113,19 @@ class Schedule:
 
         Fitness of the schedule must be re-evaluated after this step.
         """
-        lecture_ids = list(self.resources.lectures.keys())
-        random.shuffle(lecture_ids)
-        parent1_ids = lecture_ids[:int(len(lecture_ids) / 2)]
-        parent2_ids = lecture_ids[int(len(lecture_ids) / 2):]
-
-        self.entries = self.entries.iloc[0:0]
+        lecture_idxs = list(range(len(self.layout.lecture_ids)))
+        random.shuffle(lecture_idxs)
 
-        # pick from parent1
-        self.entries = self.entries.append(
-            parent1.entries.loc[parent1.entries['lecture_id'].isin(parent1_ids), :],
-            ignore_index=True
-        )
+        # lectures picked from parent1, the rest from parent2
+        from_parent1 = np.zeros(len(lecture_idxs), dtype=bool)
+        from_parent1[lecture_idxs[:int(self.parameters.crossover_size * len(lecture_idxs))]] = True
+        from_parent1 = from_parent1[self.lectures]
 
-        # pick from parent2
-        self.entries = self.entries.append(
-            parent2.entries.loc[parent2.entries['lecture_id'].isin(parent2_ids), :],
-            ignore_index=True
-        )
+        np.copyto(self.days, np.where(from_parent1, parent1.days, parent2.days))
+        np.copyto(self.hours, np.where(from_parent1, parent1.hours, parent2.hours))
+        np.copyto(self.rooms, np.where(from_parent1, parent1.rooms, parent2.rooms))
 
+        self._state = None
         self.dirty_bit = True  # indicate current fitness is obsolete
 
     def copy(self, parent: 'Schedule'):
@@ -108,9 +134,12 @@ class Schedule:
 
         Fitness is equal to the fitness of `parent`.
         """
-        self.entries = DataFrame.copy(parent.entries, deep=True)
-        self.scores = Series.copy(parent.scores, deep=True)
+        np.copyto(self.days, parent.days)
+        np.copyto(self.hours, parent.hours)
+        np.copyto(self.rooms, parent.rooms)
+        self.scores = parent.scores.copy()
         self.fitness = parent.fitness
+        self._state = parent._state.copy() if parent._state is not None else None
 
         self.dirty_bit = False
 
@@ -122,115 +151,118 @@ class Schedule:
             return
         self.dirty_bit = False
 
-        # 1. Pauli Exclusion [no two entries have the same day, hour, and room_id]
-        unique_groups = self.entries.groupby(['day', 'hour', 'room_id']).count()
-        self.scores.unique_slots = unique_groups[unique_groups == 1].sum()[0]
+        engine = self.resources.fitness_engine
+        if self._state is None:
+            self._state = engine.build_state(
+                self.days, self.hours, self.rooms,
+                self.parameters.week_days, self.parameters.daily_hours
+            )
+        self.scores = engine.scores(self._state)
+        self.fitness = self.scores.mean()
+
+    def set_scores(self, scores):
+        """
+        Assign `scores` evaluated elsewhere, e.g. in a population batch.
+        """
+        self.scores = scores
+        self.fitness = scores.mean()
+        self._state = None
 
-        for _, row in self.entries.iterrows():
-            day, hour, room_id, lecture_id = row
+        self.dirty_bit = False
 
-            room = self.resources.rooms[room_id]
-            lecture = self.resources.lectures[lecture_id]
-            course = self.resources.courses[lecture.course_id]
+    def digest(self):
+        """
+        Returns a digest of the assigned room and time slots.
+        """
+        return genome_digest(np.stack([self.days, self.hours, self.rooms]))
 
-            teachers = [self.resources.teachers[t_id] for t_id in lecture.teacher_ids]
+    def violating_lectures(self):
+        """
+        Returns indices of lectures violating any constraint.
 
-            # entries with the same day and hour
-            concurrent_l_ids = set(
-                self.entries.loc[
-                    (self.entries['day'] == day) &
-                    (self.entries['hour'] == hour)
-                    ]['lecture_id']
-            )
+        Requires tracked score contributions, see `incremental`.
+        """
+        return np.flatnonzero(self.resources.fitness_engine.violations(
+            self._state, self.days, self.hours, self.rooms, self.parameters.daily_hours
+        ))
 
-            # 2. Room's capacity is greater than lecture's strength
-            self.scores.capacity_rooms += (room.capacity >= lecture.strength)
-            # 3. Course is available at this day and hour
-            self.scores.course_slots += course.available_slots[day][hour]
-            # 4. Course is available at this room
-            self.scores.course_rooms += (room_id in course.available_room_ids)
-
-            if not teachers:
-                self.scores.teacher_slots += 1
-                self.scores.teacher_rooms += 1
-            else:
-                teacher_slots: Series = Series(index=range(len(teachers)), dtype=bool)
-                teacher_rooms: Series = Series(index=range(len(teachers)), dtype=bool)
-                for idx, teacher in enumerate(teachers):
-                    # 5. Teacher is available at this day and hour
-                    teacher_slots[idx] = teacher.available_slots[day][hour]
-                    # 6. Teacher is available at this room
-                    teacher_rooms[idx] = room_id in teacher.available_room_ids
-                self.scores.teacher_slots += teacher_slots.mean()
-                self.scores.teacher_rooms += teacher_rooms.mean()
-
-            # 7. No noncurrent lecture at this day and hour
-            self.scores.lecture_slots += concurrent_l_ids.isdisjoint(lecture.noncurrent_lecture_ids)
-
-        # scale each score between 0 and 1
-        self.scores = self.scores.div(len(self.entries.index))
-        self.fitness = self.scores.mean()
+    @property
+    def incremental(self):
+        """
+        Whether fitness can be re-evaluated from the tracked score contributions.
+        """
+        return self._state is not None
 
     def save_slots(self):
         """
         Save assigned_slots from this schedule's entries to resources.lectures
         """
-        entries: DataFrame = self.entries.rename(
-            columns={'hour': 'time', 'room_id': 'roomId', 'lecture_id': 'id'}
-        )
+        for lecture_id, slots in self.assigned_slots().items():
+            self.resources.lectures[lecture_id].assigned_slots = slots
 
-        for lecture_id, lecture_group in entries.groupby(['id']):
-            assigned_slots = lecture_group.drop(columns=['id']).to_dict(orient='records')
-            self.resources.lectures[lecture_id].assigned_slots = assigned_slots
+    def assigned_slots(self, lecture_idxs=None):
+        """
+        Returns the assigned slots of lectures at `lecture_idxs`, or of all lectures, by lecture ID.
+        """
+        if lecture_idxs is None:
+            lecture_idxs = range(len(self.layout.lecture_ids))
+        room_ids, offsets = self.layout.room_ids, self.layout.offsets
+        days, hours, rooms = self.days.tolist(), self.hours.tolist(), self.rooms.tolist()
+
+        return {
+            self.layout.lecture_ids[idx]: [
+                {'day': days[row], 'time': hours[row], 'roomId': room_ids[rooms[row]]}
+                for row in range(offsets[idx], offsets[idx + 1])
+            ]
+            for idx in lecture_idxs
+        }
+
+    def changed_lectures(self, genes):
+        """
+        Returns indices of lectures assigned other slots than in (3 x slots) `genes`.
+        """
+        changed = (np.stack([self.days, self.hours, self.rooms]) != genes).any(axis=0)
+        return np.flatnonzero(np.logical_or.reduceat(changed, self.layout.offsets[:-1]))
 
     # ----------------------------------------
     # PRIVATE METHODS
     # ----------------------------------------
 
-    def _assign_lecture(self, lecture: Lecture):
+    def _assign_lecture(self, lecture_idx: int):
         """
-        Assigns room and time slots of `lecture`.
+        Assigns room and time slots of lecture at `lecture_idx`.
         """
-        course = self.resources.courses[lecture.course_id]
+        start, end = self.layout.offsets[lecture_idx], self.layout.offsets[lecture_idx + 1]
+        duration = int(end - start)
 
-        if course.is_lab_course is True:
-            slots = self._get_random_lab_slots(course.duration)
+        if self.layout.is_lab[lecture_idx]:
+            days, hours, rooms = self._get_random_lab_slots(lecture_idx, duration)
         else:
-            slots = self._get_random_theory_slots(course.duration)
+            days, hours, rooms = self._get_random_theory_slots(lecture_idx, duration)
 
-        # add the fourth column
-        for slot in slots:
-            slot.append(lecture.id)
+        self.days[start:end] = days
+        self.hours[start:end] = hours
+        self.rooms[start:end] = rooms
 
-        self.entries = self.entries.append(DataFrame(slots, columns=self.entries.columns))
-
-    def _get_random_lab_slots(self, duration):
+    def _get_random_lab_slots(self, lecture_idx, duration):
         """
-        Returns `duration` room and time slots for a lab.
+        Returns `duration` feasible room and time slots for a lab.
         """
-        day = random.choice(range(self.parameters.week_days))
-        room_id = random.choice(list(self.resources.rooms.keys()))
-        hour = random.choice(range(self.parameters.daily_hours - duration + 1))
+        start = int(random.choice(self.domains.starts_of(lecture_idx)))
+        day, hour = divmod(start, self.parameters.daily_hours)
+        room = int(random.choice(self.domains.rooms_of(lecture_idx)))
 
-        slots = [[day, hour + i, room_id] for i in range(duration)]
-        return slots
+        return [day] * duration, [hour + i for i in range(duration)], [room] * duration
 
-    def _get_random_theory_slots(self, duration):
+    def _get_random_theory_slots(self, lecture_idx, duration):
         """
-        Returns `duration` room and time slots for a theory.
+        Returns `duration` feasible room and time slots for a theory.
         """
-        days = random.sample(range(self.parameters.week_days), k=duration)
-        room_ids = random.choices(list(self.resources.rooms.keys()), k=duration)
-        hours = random.choices(range(self.parameters.daily_hours), k=duration)
-
-        slots = [[days[i], hours[i], room_ids[i]] for i in range(duration)]
-        return slots
+        days = random.sample(np.flatnonzero(self.domains.days[lecture_idx]).tolist(), k=duration)
+        rooms = random.choices(self.domains.rooms_of(lecture_idx).tolist(), k=duration)
+        hours = [int(random.choice(self.domains.hours_of(lecture_idx, day))) for day in days]
 
-    def _remove_lectures(self, lecture_ids: list):
-        """
-        Remove room and time slots of `lecture_ids`.
-        """
-        self.entries = self.entries[~self.entries['lecture_id'].isin(lecture_ids)]
+        return days, hours, rooms
 
     def __gt__(self, other: 'Schedule'):
         return self.fitness > other.fitness
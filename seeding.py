@@ -0,0 +1,96 @@
+# -----------------------------------------------------------
+# This module builds schedules with a greedy constructive heuristic.
+#
+# Lectures are placed most-constrained first: by descending
+# clash degree, then ascending size of their feasible domain,
+# with ties broken at random. Each lecture takes the feasible
+# room and time slots with the fewest clashes and the most
+# rooms left to themselves, again breaking ties at random.
+#
+# All schedules are built together, lecture by lecture.
+#
+#
+# (C) 2020 PyShoaib
+# -----------------------------------------------------------
+
+import numpy as np
+
+from clashes import ClashGraph
+from constraints import LectureDomains
+
+# cost of adding a slot to a cell holding 0, 1, or more slots
+CELL_COSTS = np.array([-1, 1, 0], dtype=np.int16)
+
+
+def greedy_genes(domains: LectureDomains, clashes: ClashGraph, count: int, rng=np.random):
+    """
+    Returns (count x 3 x slots) genes of `count` greedily built schedules.
+    """
+    layout = domains.layout
+    genes = np.empty((count, 3, layout.size), dtype=np.int32)
+    if count == 0:
+        return genes
+
+    lectures_count = len(layout.lecture_ids)
+    periods_count = domains.week_days * domains.daily_hours
+    rooms_count = domains.rooms.shape[1]
+    schedules = np.arange(count)[:, np.newaxis]
+
+    # slots of noncurrent lectures placed so far, at each period
+    clash_load = np.zeros((count, lectures_count, periods_count), dtype=np.int16)
+    # slots placed so far in each (period, room) cell
+    cells = np.zeros((count, periods_count, rooms_count), dtype=np.int16)
+
+    domain_sizes = domains.periods.sum(axis=(1, 2)) * domains.rooms.sum(axis=1)
+    order = np.lexsort((rng.random_sample(lectures_count), domain_sizes, -clashes.degrees))
+
+    for idx in order:
+        rooms = domains.rooms_of(idx)
+        neighbours = clashes.neighbours(idx)
+        duration = int(layout.durations[idx])
+        start = int(layout.offsets[idx])
+
+        if layout.is_lab[idx]:
+            # a start period and a room for all consecutive hours
+            periods = domains.starts_of(idx)[:, np.newaxis] + np.arange(duration)
+            costs = (
+                clash_load[:, idx][:, periods].sum(axis=2)[:, :, np.newaxis]
+                + CELL_COSTS[np.minimum(cells[:, periods][:, :, :, rooms], 2)].sum(axis=2)
+            )
+            picks = _pick(costs, rng)
+            placed = periods[picks // len(rooms)]
+            placed_rooms = np.repeat(rooms[picks % len(rooms)][:, np.newaxis], duration, axis=1)
+        else:
+            # a period and a room for each slot, on distinct days
+            candidates = np.flatnonzero(domains.periods[idx].ravel())
+            used_days = np.zeros((count, domains.week_days), dtype=bool)
+            placed = np.empty((count, duration), dtype=np.int64)
+            placed_rooms = np.empty((count, duration), dtype=np.int64)
+            for position in range(duration):
+                costs = (
+                    clash_load[:, idx][:, candidates][:, :, np.newaxis]
+                    + CELL_COSTS[np.minimum(cells[:, candidates][:, :, rooms], 2)]
+                    + np.where(used_days[:, candidates // domains.daily_hours], np.inf, 0)[:, :, np.newaxis]
+                )
+                picks = _pick(costs, rng)
+                placed[:, position] = candidates[picks // len(rooms)]
+                placed_rooms[:, position] = rooms[picks % len(rooms)]
+                used_days[schedules[:, 0], placed[:, position] // domains.daily_hours] = True
+
+        # slots of a lecture never share a period, so no index repeats
+        cells[schedules, placed, placed_rooms] += 1
+        clash_load[schedules[:, :, np.newaxis], neighbours[:, np.newaxis], placed[:, np.newaxis]] += 1
+
+        genes[:, 0, start:start + duration] = placed // domains.daily_hours
+        genes[:, 1, start:start + duration] = placed % domains.daily_hours
+        genes[:, 2, start:start + duration] = placed_rooms
+
+    return genes
+
+
+def _pick(costs, rng):
+    """
+    Returns the flat index of a least costly candidate of each schedule, ties broken at random.
+    """
+    costs = costs.reshape(len(costs), -1)
+    return np.argmin(costs + 0.5 * rng.random_sample(costs.shape), axis=1)
@@ -0,0 +1,106 @@
+# -----------------------------------------------------------
+# This module provides parent selection over a fitness vector.
+#
+# Each scheme draws the parents of a whole generation at once
+# and returns (children x 2) indices of distinct parents:
+# (1) tournament            (fittest of `pressure` random schedules)
+# (2) rank                  (linear ranking by fitness)
+# (3) stochastic_universal  (equally spaced pointers over fitness)
+#
+#
+# (C) 2020 PyShoaib
+# -----------------------------------------------------------
+
+import numpy as np
+
+
+def tournament(fitness, count: int, pressure: int):
+    """
+    Returns `count` pairs of parents, each the fittest of `pressure` random schedules.
+    """
+    size = len(fitness)
+
+    competitors = np.random.randint(size, size=(count, pressure))
+    firsts = competitors[np.arange(count), np.argmax(fitness[competitors], axis=1)]
+
+    # second tournament is held without the first parent
+    competitors = np.random.randint(size - 1, size=(count, pressure))
+    competitors += competitors >= firsts[:, np.newaxis]
+    seconds = competitors[np.arange(count), np.argmax(fitness[competitors], axis=1)]
+
+    return np.stack([firsts, seconds], axis=1)
+
+
+def rank(fitness, count: int, pressure: int = None):
+    """
+    Returns `count` pairs of parents, drawn with probability linear in their rank.
+    """
+    ranks = np.empty(len(fitness))
+    ranks[np.argsort(fitness, kind='stable')] = np.arange(1, len(fitness) + 1)
+    probabilities = ranks / ranks.sum()
+
+    firsts = np.searchsorted(np.cumsum(probabilities), np.random.random(count), side='right')
+    firsts = np.minimum(firsts, len(fitness) - 1)
+
+    return np.stack([firsts, _other(probabilities, firsts)], axis=1)
+
+
+def stochastic_universal(fitness, count: int, pressure: int = None):
+    """
+    Returns `count` pairs of parents, drawn proportionally to fitness
+    by `2 * count` equally spaced pointers.
+    """
+    total = fitness.sum()
+    if total > 0:
+        probabilities = fitness / total
+    else:
+        probabilities = np.full(len(fitness), 1 / len(fitness))
+
+    pointers = (np.random.random() + np.arange(2 * count)) / (2 * count)
+    parents = np.searchsorted(np.cumsum(probabilities), pointers, side='right')
+    parents = np.minimum(parents, len(fitness) - 1)
+    np.random.shuffle(parents)
+
+    parents = parents.reshape(count, 2)
+    same = parents[:, 0] == parents[:, 1]
+    parents[same, 1] = _other(probabilities, parents[same, 0])
+
+    return parents
+
+
+SELECTIONS = {
+    'tournament': tournament,
+    'rank': rank,
+    'stochastic_universal': stochastic_universal,
+}
+
+
+def select_parents(fitness, count: int, scheme: str = 'tournament', pressure: int = 4):
+    """
+    Returns (count x 2) indices of distinct parents selected by `scheme`.
+    """
+    if scheme not in SELECTIONS:
+        raise ValueError(f'Unknown selection scheme: {scheme}')
+
+    return SELECTIONS[scheme](np.asarray(fitness, dtype=np.float64), count, pressure)
+
+
+def _other(probabilities, firsts):
+    """
+    Returns a schedule other than each of `firsts`, drawn from `probabilities`.
+    """
+    cumulative = np.cumsum(probabilities)
+    excluded = probabilities[firsts]
+
+    # draw from the distribution with each first parent's share removed
+    draws = np.random.random(len(firsts)) * (1 - excluded)
+    draws = np.where(draws < cumulative[firsts] - excluded, draws, draws + excluded)
+    others = np.minimum(np.searchsorted(cumulative, draws, side='right'), len(probabilities) - 1)
+
+    # first parents holding all the probability leave others uniform
+    stuck = others == firsts
+    others[stuck] = (firsts[stuck] + 1 + np.random.randint(
+        len(probabilities) - 1, size=np.count_nonzero(stuck)
+    )) % len(probabilities)
+
+    return others
@@ -0,0 +1,159 @@
+# -----------------------------------------------------------
+# This module represents the interface of schedule search engines.
+#
+# A solver is driven step by step:
+# (1) initialize  (seed random generators and build the first schedules)
+# (2) step        (advance the search by one generation)
+# (3) close       (release processes or other resources)
+#
+# Each step evaluates about `population_size` schedules or moves,
+# so `maximum_generations` bounds the effort of every engine alike.
+# The exception is a GeneticAlgorithm with steady_state replacement,
+# whose generation evaluates only `offspring_size` schedules.
+# After each step, `best_schedule`, `best_fitness` and
+# `optimum_reached` describe the best schedule found so far.
+#
+# A run also stops early once its `stop_event` is set or its
+# `time_limit` is over. Engines check `stopped` within a step,
+# so a stop takes effect within one generation. A generation
+# abandoned by a stop (`_reproduce` returns False) is not counted.
+#
+#
+# (C) 2020 PyShoaib
+# -----------------------------------------------------------
+
+import random
+import time
+
+import numpy as np
+
+from parameters import Parameters
+from resources import Resources
+from schedule import Schedule
+from seeding import greedy_genes
+
+
+class Solver:
+    """
+    Searches for a schedule fulfilling all constraints.
+
+    Subclasses implement `_initialize` and `_reproduce`.
+    """
+
+    def __init__(self, resources: Resources, parameters: Parameters):
+        self.resources = resources
+        self.parameters = parameters
+
+        self.generation = 0
+        self.optimum_reached = False
+        self.best_fitness = 0.0
+        self.best_schedule = None
+
+        self.stop_event = None  # an event set by another thread or process to stop the run
+        self._deadline = None
+
+    def run(self):
+        try:
+            self.initialize()
+            while not self.done:
+                self.step()
+                print(f'Gen: {self.generation}  Best: {self.best_fitness}')
+        finally:
+            self.close()
+
+        return self.optimum_reached
+
+    @property
+    def done(self):
+        """
+        Whether the optimum or the maximum generation is reached, or the run is stopped.
+        """
+        return (
+            self.optimum_reached
+            or self.generation >= self.parameters.maximum_generations
+            or self.stopped
+        )
+
+    @property
+    def stopped(self):
+        """
+        Whether the run is asked to stop, or its time limit is over.
+        """
+        return self.stop_event is not None and self.stop_event.is_set() or self.timed_out
+
+    @property
+    def timed_out(self):
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    @property
+    def rates(self):
+        """
+        Returns the effective rates of the current generation, for progress messages.
+        """
+        return {}
+
+    def initialize(self):
+        """
+        Seed the random generators and build the first schedules.
+        """
+        if self.parameters.seed is not None:
+            random.seed(self.parameters.seed)
+            np.random.seed(self.parameters.seed)
+
+        if self.parameters.time_limit:
+            self._deadline = time.monotonic() + self.parameters.time_limit
+
+        self._initialize()
+
+    def step(self):
+        """
+        Advance the search by one generation.
+        """
+        if self._reproduce() is False:
+            return
+        self.generation += 1
+
+    def close(self):
+        """
+        Release processes held by the solver, if any.
+        """
+
+    # ----------------------------------------
+    # PRIVATE METHODS
+    # ----------------------------------------
+
+    def _initialize(self):
+        raise NotImplementedError
+
+    def _reproduce(self):
+        raise NotImplementedError
+
+    def _initial_schedule(self):
+        """
+        Returns a schedule built greedily if `greedy_fraction` is set, randomly otherwise,
+        with its score contributions tracked.
+        """
+        schedule = Schedule(self.resources, self.parameters)
+        if self.parameters.greedy_fraction > 0:
+            schedule.days[:], schedule.hours[:], schedule.rooms[:] = greedy_genes(
+                schedule.domains, self.resources.clashes, 1
+            )[0]
+            schedule.dirty_bit = True
+        else:
+            schedule.initialize()
+
+        schedule.calculate_fitness()
+        return schedule
+
+    def _record(self, schedule: Schedule):
+        """
+        Keep a copy of `schedule` if it is the best so far.
+        """
+        if schedule.fitness <= self.best_fitness and self.best_schedule is not None:
+            return
+
+        self.best_schedule = Schedule(self.resources, self.parameters)
+        self.best_schedule.copy(schedule)
+        self.best_fitness = schedule.fitness
+
+        self.optimum_reached = self.best_fitness == 1.0
@@ -0,0 +1,78 @@
+# -----------------------------------------------------------
+# This module represents a tabu search solver.
+#
+# A single schedule is improved by moving one lecture per generation:
+# `population_size` random moves of lectures violating any constraint
+# are scored, and the best is taken even if it lowers the fitness.
+# A moved lecture stays tabu for `tabu_tenure` generations, unless
+# moving it would beat the best schedule found so far.
+#
+# Moves are scored incrementally from the schedule's tracked
+# score contributions.
+#
+#
+# (C) 2020 PyShoaib
+# -----------------------------------------------------------
+
+import random
+
+import numpy as np
+
+from parameters import Parameters
+from resources import Resources
+from solver import Solver
+
+
+class TabuSearch(Solver):
+    """
+    Searches the neighbourhood of a single schedule, with recently moved lectures tabu.
+    """
+
+    def __init__(self, resources: Resources, parameters: Parameters):
+        super().__init__(resources, parameters)
+
+        # generation until which each lecture may not be moved
+        self._tabu = np.zeros(len(resources.lecture_ids), dtype=np.int64)
+        self._schedule = None
+
+    def _initialize(self):
+        self._schedule = self._initial_schedule()
+        self._record(self._schedule)
+
+    def _reproduce(self):
+        schedule = self._schedule
+        engine = self.resources.fitness_engine
+
+        violating = schedule.violating_lectures()
+        if len(violating) == 0:
+            return
+
+        best = None
+        for _ in range(self.parameters.population_size):
+            if self.stopped:
+                break
+            lecture_idxs = [int(random.choice(violating))]
+            old_genes = schedule.reassign(lecture_idxs)
+            schedule.calculate_fitness()
+
+            allowed = (
+                self._tabu[lecture_idxs[0]] <= self.generation
+                or schedule.fitness > self.best_fitness
+            )
+            if allowed and (best is None or schedule.fitness > best[0]):
+                rows = engine.slots_of(np.array(lecture_idxs))
+                best = schedule.fitness, lecture_idxs, (
+                    schedule.days[rows], schedule.hours[rows], schedule.rooms[rows]
+                )
+
+            schedule.reassign(lecture_idxs, *old_genes)
+            schedule.calculate_fitness()
+
+        if best is None:
+            return
+
+        _, lecture_idxs, genes = best
+        schedule.reassign(lecture_idxs, *genes)
+        schedule.calculate_fitness()
+        self._tabu[lecture_idxs] = self.generation + self.parameters.tabu_tenure
+        self._record(schedule)